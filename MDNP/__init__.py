@@ -6,10 +6,14 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 18-09-2023 02:05:44
+# Last modified: 18-10-2026 15:11:47
 
 from . import nonmpi
-from . import mpi
-from . import post_processors
+try:
+    from . import mpi
+except ModuleNotFoundError as e:
+    # local runner works without mpi4py, any other import error is real
+    if e.name != "mpi4py":
+        raise
 from . import constants
 from . import utilities
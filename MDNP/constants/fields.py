@@ -6,7 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 10-09-2023 07:05:59
+# Last modified: 18-10-2026 15:16:06
 
 
 storages: str = "storages"
@@ -14,6 +14,12 @@ time_step: str = "time_step"
 every: str = "every"
 data_processing_folder: str = "post_process_folder"
 matrix_storages: str = "mat_storages"
+per_rank: str = "per_rank"
+cutoffs: str = "cutoffs"
+min_neighbors: str = "min_neighbors"
+backend: str = "backend"
+threads: str = "threads"
+batch: str = "batch"
 
 dimensions: str = "dimensions"
 volume: str = "Volume"
@@ -6,17 +6,20 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 09-09-2023 01:25:50
+# Last modified: 18-10-2026 14:53:03
 
 log: str = 'end.log'
 
 post_process_state: str = "st.json"
 cluster_distribution_matrix: str = "matrice.csv"
+matrix: str = "matrice.npy"  # binary matrix, metadata in matrice.json
+temps_matrix: str = "temps.npy"
 data = 'data.json'
 temperature: str = "temperature.log"
 temperature_backup: str = "temperature.log.bak"
 xi_log: str = "xi.log"
 mat_storage: str = "ntb.bp"
+catalog: str = "catalog.npz"  # global step -> storage, step in storage, timestep, matrix row
 comp_data: str = "rdata.csv"  # computed data
 
 if __name__ == "__main__":
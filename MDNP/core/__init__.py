@@ -6,8 +6,19 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 10-09-2023 08:04:01
+# Last modified: 18-10-2026 15:13:00
 
 from . import calc
 from . import distribution
 from . import props
+from . import stats
+from . import frame
+from . import reader
+from . import timers
+from . import matrix
+from . import catalog
+from . import temperature
+from . import cells
+from . import assembly
+from . import adios_wrap
+from . import kernels
@@ -6,26 +6,26 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 19-09-2023 18:44:36
+# Last modified: 18-10-2026 15:13:00
 
+import logging
 from typing import Dict, Any
 
 import adios2
 import numpy as np
 from numpy import typing as npt
 
-from .utils_mpi import MC
-
 
 class adser:
-    def __init__(self, sts: MC, mpi: bool = False) -> None:
-        self.mpi = mpi
-        self.logger = sts.logger.getChild('adios_lib')
+    def __init__(self, logger: logging.Logger, mpi_comm: Any = None) -> None:
+        # storage is shared by all ranks of mpi_comm if it is given
+        self.mpi = mpi_comm is not None
+        self.logger = logger.getChild('adios_lib')
         self.logger.debug("Creating ADIOS instance")
         if self.mpi:
-            self.rank = sts.mpi_rank
-            self.size = sts.mpi_size
-            self.adios = adios2.ADIOS(sts.mpi_comm)  # type: ignore
+            self.rank = mpi_comm.Get_rank()
+            self.size = mpi_comm.Get_size()
+            self.adios = adios2.ADIOS(mpi_comm)  # type: ignore
         else:
             self.rank = 0
             self.size = 1
@@ -38,6 +38,7 @@ class adser:
         self.fileID = self.bpIO.AddTransport('File', {'Library': 'POSIX'})
         self.vars_arr: Dict[str, Any] = {}
         self.vars_one: Dict[str, Any] = {}
+        self.vars_sparse: Dict[str, Any] = {}
         self.opened = False
         self.step = 0
 
@@ -76,6 +77,19 @@ class adser:
             adios2.ConstantDims)   # type: ignore # constantDims
         self.vars_arr[name] = ((Nx, Ny), var, dtype)
 
+    def declare_sparse(self, name: str, dtype):
+        if self.mpi:
+            raise NotImplementedError("Variable-size arrays are supported only without MPI")
+        self.logger.debug(f"Declaring variable-size 1D variable '{name}' with type {dtype}")
+        var = self.bpIO.DefineVariable(
+            name,                  # name
+            np.zeros(1, dtype=dtype),
+            [1],                   # shape, changed on every write
+            [0],                   # start
+            [1],                   # count
+            False)                 # constantDims
+        self.vars_sparse[name] = (var, dtype)
+
     def declare_one(self, name: str, dtype):
         self.logger.debug(f"Declaring 0D variable '{name}' with type {dtype}")
         self.vars_one[name] = (
@@ -102,6 +116,13 @@ class adser:
         arr = arr.astype(dtype=dtype)
         self.adwriter.Put(var, arr)
 
+    def wr_sparse(self, name: str, arr: npt.NDArray):
+        var, dtype = self.vars_sparse[name]
+        arr = np.ascontiguousarray(arr, dtype=dtype)
+        var.SetShape([arr.size])
+        var.SetSelection([[0], [arr.size]])
+        self.adwriter.Put(var, arr, adios2.Mode.Sync)  # type: ignore
+
     def wr_2d_array(self, name: str, arr: npt.NDArray):
         raise NotImplementedError("Writing 2D arrays is not yet supported")
         # self.logger.debug(f"Writing variable '{name}'")
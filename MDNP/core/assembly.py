@@ -0,0 +1,136 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:28:28
+
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Union, Optional
+
+import numpy as np
+from numpy import typing as npt
+
+from .. import constants as cs
+from . import distribution, matrix
+from .catalog import Catalog
+
+
+def pack(sizes: npt.NDArray, counts: npt.NDArray, temps: Union[npt.NDArray, None] = None, total: float = 0.0, out: Optional[npt.NDArray[np.float64]] = None) -> Tuple[npt.NDArray[np.float64], int, int]:
+    # layout of RESULT payload: total temperature, sizes, counts and optionally temperatures
+    # out is reused when it has the right size
+    n = len(sizes)
+    k = 2 if temps is None else 3
+    payload = out if out is not None and out.size == 1 + k * n else np.empty(1 + k * n, dtype=np.float64)
+    payload[0] = total
+    payload[1:1 + n] = sizes
+    payload[1 + n:1 + 2 * n] = counts
+    if temps is not None:
+        payload[1 + 2 * n:] = temps
+    return payload, n, k
+
+
+class Assembler():
+    def __init__(self, temps: bool, adout: Optional[Any] = None, name: str = cs.files.matrix, channels: int = 1) -> None:
+        self.temps = temps
+        self.name = name
+        # matrices of additional cutoffs, only primary one goes to storage and catalog
+        stem = Path(name).stem
+        self.extra: List[Assembler] = [Assembler(False, name=f"{stem}.{c}.npy") for c in range(1, channels)]
+        self.rows: Dict[int, Tuple[int, float, npt.NDArray[np.int64], npt.NDArray[np.uint32], Union[npt.NDArray[np.float64], None]]] = {}
+        self.max_size = 0
+        # consolidated storage, rows are written to it in order of global step
+        self.adout = adout
+        self.next = 0
+        # where every step is stored: rank of worker (-1 for consolidated storage) and step in that storage
+        self.where: Dict[int, Tuple[int, int]] = {}
+        self.counts: Dict[int, int] = {}
+        if adout is not None:
+            adout.declare_arr(cs.lcf.mat_step, 1, np.int64)
+            adout.declare_arr(cs.lcf.real_timestep, 1, np.int64)
+            adout.declare_sparse(cs.lcf.sizes, np.int64)
+            adout.declare_sparse(cs.lcf.size_counts, np.int64)
+            if temps:
+                adout.declare_arr(cs.lcf.tot_temp, 1, np.float32)
+                adout.declare_sparse(cs.lcf.cl_temps, np.float64)
+
+    def add(self, source: int, step: int, timestep: int, payload: npt.NDArray[np.float64], n: int, k: int, channel: int = 0) -> None:
+        if channel != 0:
+            return self.extra[channel - 1].add(source, step, timestep, payload, n, k)
+        # payload: total temperature, then sizes, counts and optionally temperatures, n values each
+        sizes = payload[1:1 + n].astype(np.int64)
+        counts = payload[1 + n:1 + 2 * n].astype(np.uint32)
+        if self.temps != (k == 3):
+            # zeros in place of missing temperatures would look like real data
+            raise ValueError(f"Step {step} has {'no ' if k != 3 else ''}temperatures, but assembler {'expects' if self.temps else 'does not expect'} them")
+        temps = payload[1 + 2 * n:1 + 3 * n].copy() if k == 3 else None
+        self.rows[step] = (timestep, float(payload[0]), sizes, counts, temps)
+        if n != 0:
+            self.max_size = max(self.max_size, int(sizes[-1]))
+        if self.adout is None:
+            # worker writes its rows to own storage in the same order it sends them
+            self.where[step] = (source, self.counts.get(source, 0))
+            self.counts[source] = self.where[step][1] + 1
+        else:
+            while self.next in self.rows:
+                self.write(self.next)
+                self.next += 1
+
+    def write(self, step: int) -> None:
+        timestep, total, sizes, counts, temps = self.rows[step]
+        adout = self.adout
+        self.where[step] = (-1, adout.step)
+        adout.begin_step()
+        adout.wr_array(cs.lcf.mat_step, np.array(step))
+        adout.wr_array(cs.lcf.real_timestep, np.array(timestep))
+        adout.wr_sparse(cs.lcf.sizes, sizes)
+        adout.wr_sparse(cs.lcf.size_counts, counts)
+        if self.temps:
+            adout.wr_array(cs.lcf.tot_temp, np.array(total))
+            adout.wr_sparse(cs.lcf.cl_temps, temps)
+        adout.end_step()
+
+    def catalog(self, storages: Dict[int, Path]) -> Catalog:
+        steps = np.array(sorted(self.rows), dtype=np.int64)
+        keys = sorted(storages)
+        where = np.array([self.where[step] for step in steps], dtype=np.int64).reshape(-1, 2)
+        timesteps = np.array([self.rows[step][0] for step in steps], dtype=np.int64)
+        storage = np.searchsorted(keys, where[:, 0])
+        return Catalog(steps, storage, where[:, 1], timesteps, [storages[key].as_posix() for key in keys])
+
+    def finish(self, folder: Path) -> None:
+        if self.adout is not None:
+            # steps after a gap in numbering, if any
+            for step in sorted(self.rows):
+                if step >= self.next:
+                    self.write(step)
+            self.adout.close()
+        cut = self.max_size + 1
+        steps = sorted(self.rows)
+        mat_fp = folder / self.name
+        mat = matrix.create(mat_fp, len(steps), cut, np.uint32)
+        if self.temps:
+            temps_fp = folder / cs.files.temps_matrix
+            temps = matrix.create(temps_fp, len(steps), cut + 1, np.float32)
+        for row, step in enumerate(steps):
+            _, total, sizes, counts, cl_temps = self.rows[step]
+            mat[row, 0] = step
+            mat[row, 1:] = distribution.to_dense(sizes, counts, cut)
+            if self.temps:
+                temps[row, 0] = step
+                temps[row, 1] = total
+                temps[row, 2:] = 0
+                m = min(cut, len(cl_temps))
+                temps[row, 2:2 + m] = cl_temps[:m]
+        matrix.finish(mat_fp, mat, {"cut": cut})
+        if self.temps:
+            matrix.finish(temps_fp, temps, {"cut": cut})
+        for extra in self.extra:
+            extra.finish(folder)
+
+
+if __name__ == "__main__":
+    pass
@@ -6,97 +6,78 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 17-11-2023 02:28:58
+# Last modified: 18-10-2026 15:27:36
 
 
 import numpy as np
-from typing import Union, List
+from typing import List, Optional
 from numpy import typing as npt
 
 from . import props
-from ..utils import fp
 
 
-def mean_size(sizes: npt.NDArray[np.uint32], dist: npt.NDArray[np.uint32]) -> fp:
-    return np.sum(sizes * dist) / np.sum(dist)
-
-
-def condensation_degree(dist: npt.NDArray[np.uint32], sizes: npt.NDArray[np.uint32], N: int, km: int) -> fp:
-    return 1 - np.sum(sizes[:km] * dist[:km]) / N
-
-
-def maxsize(sizes: npt.NDArray[np.uint32], dist: npt.NDArray[np.uint32]) -> int:
-    return sizes[np.nonzero(dist)][-1]  # type: ignore
-
-
-def nvv(sizes: npt.NDArray[np.uint32], dist: npt.NDArray[np.uint32], volume: float, kmin: int) -> fp:
-    # type: ignore
-    return np.sum(dist[sizes <= kmin] * sizes[sizes <= kmin]) / volume
-
-
-def nd(sizes: npt.NDArray[np.uint32], dist: npt.NDArray[np.uint32], volume: float, kmin: int) -> fp:
-    return np.sum(dist[sizes >= kmin]) / volume
-
-
-def nvs(sizes: npt.NDArray[np.uint32], dist: npt.NDArray[np.uint32], volume: float, kmin: int, T: float) -> Union[float, None]:
-    ms = sizes[-1]
-    n1 = dist[0] / volume
-    dzd = dist[kmin - 1:ms]
-    kks = np.arange(kmin, ms + 1, dtype=np.uint32)**(1 / 3)
-    num = n1 * np.sum(kks**2 * dzd) / volume
-    if num == 0:
-        return None
-    rl = (3 / (4 * np.pi * props.nl(T)))**(1 / 3)
-    cplx = 2 * props.sigma(T) / (props.nl(T) * T * rl)
-    denum = np.sum(kks**2 * dzd * np.exp(cplx / kks)) / volume
-
-    return num / denum
-
-
-def Srh_props(nvv: fp, T: float) -> fp:
-    return nvv/props.nvs(T)
+class NvsCache():
+    def __init__(self, sizes: npt.NDArray[np.uint32], kmin: int) -> None:
+        # size powers are fixed for a run
+        self.kmin = kmin
+        self.ms = int(sizes[-1])
+        self.kks: npt.NDArray[np.float64] = np.arange(kmin, self.ms + 1, dtype=np.float64)**(1 / 3)
+        self.kks2: npt.NDArray[np.float64] = self.kks**2
+
+    def __call__(self, dists: npt.NDArray[np.float64], T: npt.NDArray[np.float64], volume: float) -> npt.NDArray[np.float64]:
+        # nvs for block of distributions, NaN where there are no clusters bigger than kmin
+        dzd = dists[:, self.kmin - 1:self.ms]
+        # sizes above largest present one contribute nothing
+        nz = np.flatnonzero(np.any(dzd != 0, axis=0))
+        n = int(nz[-1]) + 1 if len(nz) != 0 else 0
+        dzd = dzd[:, :n] * self.kks2[:n]
+        num = dists[:, 0] / volume * np.sum(dzd, axis=1) / volume
+        denum = np.zeros(len(T), dtype=np.float64)
+        if (rows := np.flatnonzero(num != 0)).size != 0:
+            Tr = T[rows]
+            rl = (3 / (4 * np.pi * props.nl(Tr)))**(1 / 3)
+            cplx = 2 * props.sigma(Tr) / (props.nl(Tr) * Tr * rl)
+            denum[rows] = np.sum(dzd[rows] * np.exp(cplx[:, None] / self.kks[None, :n]), axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(num == 0, np.nan, num / (denum / volume))
 
 
 def get_spec() -> List[str]:
     return ['step', 'time', 'x', 'nv', 'T', 'nvs', 'Srh', 'Srh_p', 'nd', 'S1']
 
 
-def get_row(step: int, sizes: npt.NDArray[np.uint32], dist: npt.NDArray[np.uint32], T: float, N_atoms: int, volume: float, dt: float, dis: int, kmin: int) -> npt.NDArray[np.float32]:
-    # km: int = 10
-    # eps = 0.9
-
-    # ld = np.array([np.sum(sizes[:i]*dist[:i]) / N_atoms for i in range(1, len(dist))], dtype=np.float32)
-    # km = np.argmin(np.abs(ld - eps))
-
-    # tow = np.zeros(8, dtype=np.float32)
-    nv: fp = nvv(sizes, dist, volume, kmin)
-    nvss = nvs(sizes, dist, volume, kmin, T)
-    if nvss is None:
-        Srh = 0
-    else:
-        Srh = nv / nvss
-    try:
-        S = dist[0] / props.n1s(T) / volume
-    except Exception:
-        S = 0
-    tow: List[fp | None] = [
-        step,
-        round(step * dt * dis),
-        condensation_degree(dist, sizes, N_atoms, km=kmin),
-        nv,
-        T,
-        nvss,
-        Srh,
-        Srh_props(nv, T),
-        nd(sizes, dist, volume, kmin),
-        S
-    ]
-    # tow[1] = mean_size(sizes, dist)
-    # tow[2] = maxsize(sizes, dist)
-    # tow[5] = nd(sizes, dist, volume, g)
-    # tow[6] = len(dist[dist > 1])
-    # tow[9] = np.sum(dist[g-1:])
-    return np.array(tow, dtype=np.float32)
+def get_rows(steps: npt.NDArray, sizes: npt.NDArray[np.uint32], dists: npt.NDArray[np.uint32], T: npt.NDArray, N_atoms: int, volume: float, dt: float, dis: int, kmin: int, cache: Optional[NvsCache] = None) -> npt.NDArray[np.float32]:
+    # same columns as get_row, one row per distribution in block
+    steps = np.asarray(steps, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    dists = np.asarray(dists, dtype=np.float64)
+    sizes_f = sizes.astype(np.float64)
+    tow = np.zeros((len(steps), 10), dtype=np.float64)
+
+    nv = dists[:, sizes <= kmin] @ sizes_f[sizes <= kmin] / volume
+
+    if cache is None or cache.kmin != kmin or cache.ms != int(sizes[-1]):
+        cache = NvsCache(sizes, kmin)
+    nvss = cache(dists, T, volume)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Srh = np.where(np.isnan(nvss), 0, nv / nvss)
+        S = dists[:, 0] / props.n1s(T) / volume
+
+    tow[:, 0] = steps
+    tow[:, 1] = np.round(steps * dt * dis)
+    tow[:, 2] = 1 - dists[:, :kmin] @ sizes_f[:kmin] / N_atoms
+    tow[:, 3] = nv
+    tow[:, 4] = T
+    tow[:, 5] = nvss
+    tow[:, 6] = Srh
+    tow[:, 7] = nv / props.nvs(T)
+    tow[:, 8] = np.sum(dists[:, sizes >= kmin], axis=1) / volume
+    tow[:, 9] = S
+    return tow.astype(np.float32)
+
+
+def get_row(step: int, sizes: npt.NDArray[np.uint32], dist: npt.NDArray[np.uint32], T: float, N_atoms: int, volume: float, dt: float, dis: int, kmin: int, cache: Optional[NvsCache] = None) -> npt.NDArray[np.float32]:
+    return get_rows(np.array([step]), sizes, dist[None, :], np.array([T]), N_atoms, volume, dt, dis, kmin, cache)[0]
 
 
 if __name__ == "__main__":
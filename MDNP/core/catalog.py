@@ -0,0 +1,111 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 14:53:03
+
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+from numpy import typing as npt
+
+from .. import constants as cs
+from .reader import Reader
+
+
+class Catalog():
+    def __init__(self, steps: npt.NDArray, storage: npt.NDArray, local: npt.NDArray, timesteps: npt.NDArray, storages: List[str]) -> None:
+        order = np.argsort(steps, kind='stable')
+        self.steps: npt.NDArray[np.int64] = np.asarray(steps, dtype=np.int64)[order]
+        self.storage: npt.NDArray[np.int32] = np.asarray(storage, dtype=np.int32)[order]
+        self.local: npt.NDArray[np.int64] = np.asarray(local, dtype=np.int64)[order]
+        self.timesteps: npt.NDArray[np.int64] = np.asarray(timesteps, dtype=np.int64)[order]
+        # rows of matrix are sorted by step too
+        self.rows: npt.NDArray[np.int64] = np.arange(len(self.steps), dtype=np.int64)
+        self.storages: List[str] = list(storages)
+        # dense step -> row table, -1 marks missing steps
+        self.first = int(self.steps[0]) if len(self.steps) != 0 else 0
+        span = int(self.steps[-1]) - self.first + 1 if len(self.steps) != 0 else 0
+        self.index: npt.NDArray[np.int64] = np.full(span, -1, dtype=np.int64)
+        self.index[self.steps - self.first] = self.rows
+        self.readers: Dict[int, Reader] = {}
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def row(self, step: int) -> int:
+        k = step - self.first
+        if k < 0 or k >= len(self.index) or self.index[k] < 0:
+            raise KeyError(f"Step {step} is not in catalog")
+        return int(self.index[k])
+
+    def row_by_timestep(self, timestep: int) -> int:
+        k = int(np.searchsorted(self.timesteps, timestep))
+        if k == len(self.timesteps) or self.timesteps[k] != timestep:
+            raise KeyError(f"Timestep {timestep} is not in catalog")
+        return k
+
+    def rows_between(self, begin: int, end: int) -> npt.NDArray[np.int64]:
+        # rows of steps in [begin, end)
+        return self.rows[np.searchsorted(self.steps, begin):np.searchsorted(self.steps, end)]
+
+    def locate(self, step: int) -> Tuple[str, int, int, int]:
+        row = self.row(step)
+        return self.storages[self.storage[row]], int(self.local[row]), int(self.timesteps[row]), row
+
+    def reader(self, row: int) -> Reader:
+        k = int(self.storage[row])
+        if (reader := self.readers.get(k)) is None:
+            reader = Reader(self.storages[k], random_access=True).open()
+            self.readers[k] = reader
+        reader.seek(int(self.local[row]))
+        return reader
+
+    def read(self, step: int, name: str, dtype=None) -> npt.NDArray:
+        return self.reader(self.row(step)).read_array(name, dtype)
+
+    def close(self) -> None:
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as fp:
+            np.savez(fp, steps=self.steps, storage=self.storage, local=self.local, timesteps=self.timesteps, storages=np.array(self.storages, dtype=str))
+
+
+def load(path: Path) -> Catalog:
+    with np.load(path) as data:
+        return Catalog(data["steps"], data["storage"], data["local"], data["timesteps"], [str(s) for s in data["storages"]])
+
+
+def build(storages: List[Union[Path, str]]) -> Catalog:
+    # rebuilds catalog by scanning storages, for outputs written without one
+    steps: List[int] = []
+    storage: List[int] = []
+    local: List[int] = []
+    timesteps: List[int] = []
+    for k, fp in enumerate(storages):
+        with Reader(fp, random_access=True) as reader:
+            has_timestep = reader.has(cs.lcf.real_timestep)
+            for step in reader.steps():
+                steps.append(int(reader.read_one(cs.lcf.mat_step)))
+                storage.append(k)
+                local.append(step)
+                timesteps.append(int(reader.read_one(cs.lcf.real_timestep)) if has_timestep else -1)
+    return Catalog(np.array(steps), np.array(storage), np.array(local), np.array(timesteps), [Path(fp).as_posix() for fp in storages])
+
+
+if __name__ == "__main__":
+    pass
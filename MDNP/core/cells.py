@@ -0,0 +1,109 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:26:17
+
+import itertools
+from typing import List, Tuple
+
+import numpy as np
+from numpy import typing as npt
+
+
+class Box():
+    # orthorhombic periodic box, same attributes as used from freud one
+    def __init__(self, Lx: float, Ly: float, Lz: float) -> None:
+        # single precision, as in freud, so bonds near cutoff fall on same side of it
+        self.L: npt.NDArray[np.float32] = np.array([Lx, Ly, Lz], dtype=np.float32)
+        self.Lx, self.Ly, self.Lz = float(Lx), float(Ly), float(Lz)
+        self.volume = float(np.prod(self.L))
+
+    @classmethod
+    def from_box(cls, dims) -> "Box":
+        return cls(dims[0], dims[1], dims[2])
+
+    def wrap(self, vectors: npt.NDArray) -> npt.NDArray:
+        # into [-L/2, L/2) along every axis
+        return vectors - self.L * np.floor(vectors / self.L + 0.5)
+
+
+def pairs(points: npt.NDArray, box: Box, r_max: float) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    # every pair i < j closer than r_max, found through cell list
+    n = len(points)
+    points = np.asarray(points, dtype=np.float64)
+    ncells = np.maximum(1, np.floor(box.L / r_max).astype(np.int64))
+    cell3 = np.floor((box.wrap(points) / box.L + 0.5) * ncells).astype(np.int64) % ncells
+    flat = (cell3[:, 0] * ncells[1] + cell3[:, 1]) * ncells[2] + cell3[:, 2]
+    order = np.argsort(flat, kind='stable')
+    count = np.bincount(flat, minlength=int(np.prod(ncells)))
+    start = np.cumsum(count) - count
+
+    # neighbour cells, each visited once even if box is less than three cells wide
+    shifts: List[npt.NDArray[np.int64]] = [np.unique(np.array([-1, 0, 1]) % ncells[d]) for d in range(3)]
+    ii: List[npt.NDArray[np.int64]] = []
+    jj: List[npt.NDArray[np.int64]] = []
+    dd: List[npt.NDArray[np.float64]] = []
+    for sx, sy, sz in itertools.product(*shifts):
+        other = (cell3 + np.array([sx, sy, sz])) % ncells
+        oflat = (other[:, 0] * ncells[1] + other[:, 1]) * ncells[2] + other[:, 2]
+        cnt = count[oflat]
+        total = int(np.sum(cnt))
+        if total == 0:
+            continue
+        i = np.repeat(np.arange(n), cnt)
+        first = np.repeat(start[oflat], cnt)
+        j = order[first + np.arange(total) - np.repeat(np.cumsum(cnt) - cnt, cnt)]
+        keep = i < j
+        i, j = i[keep], j[keep]
+        vec = box.wrap(points[j] - points[i])
+        d = np.sqrt(np.einsum('ij,ij->i', vec, vec))
+        close = d < r_max
+        ii.append(i[close])
+        jj.append(j[close])
+        dd.append(d[close])
+    if len(ii) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    return np.concatenate(ii), np.concatenate(jj), np.concatenate(dd)
+
+
+def union_find(n: int, i: npt.NDArray, j: npt.NDArray) -> npt.NDArray[np.int64]:
+    # label of every point is the least index in its component
+    parent = np.arange(n, dtype=np.int64)
+    while True:
+        pi, pj = parent[i], parent[j]
+        if np.all(pi == pj):
+            return parent
+        # hook larger root under smaller one, then jump pointers until tree is flat
+        np.minimum.at(parent, np.maximum(pi, pj), np.minimum(pi, pj))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def cluster_sizes(n: int, i: npt.NDArray, j: npt.NDArray) -> npt.NDArray[np.int64]:
+    counts = np.bincount(union_find(n, i, j), minlength=n)
+    return counts[counts != 0]
+
+
+def batch_cluster_sizes(n: int, edges: List[Tuple[npt.NDArray, npt.NDArray]]) -> List[npt.NDArray[np.int64]]:
+    # several frames of n points each in one union-find pass
+    offsets = np.arange(len(edges), dtype=np.int64) * n
+    i = np.concatenate([e[0] + off for e, off in zip(edges, offsets)]) if edges else np.zeros(0, dtype=np.int64)
+    j = np.concatenate([e[1] + off for e, off in zip(edges, offsets)]) if edges else np.zeros(0, dtype=np.int64)
+    labels = union_find(n * len(edges), i, j)
+    out: List[npt.NDArray[np.int64]] = []
+    for k in range(len(edges)):
+        counts = np.bincount(labels[k * n:(k + 1) * n] - k * n, minlength=n)
+        out.append(counts[counts != 0])
+    return out
+
+
+if __name__ == "__main__":
+    pass
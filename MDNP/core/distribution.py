@@ -6,22 +6,34 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 16-09-2023 01:37:01
+# Last modified: 18-10-2026 15:26:17
 
 
-import freud  # type: ignore
+from typing import List, Tuple, Union, Optional
+
 import numpy as np
 from numpy import typing as npt
 
+from . import cells
+
+try:
+    import freud  # type: ignore
+except ImportError:
+    # cells backend works without it
+    freud = None
+
+# freud 3 builds neighbour lists from bond vectors, older versions from distances
+FREUD_VECTORS = freud is not None and int(freud.__version__.split(".")[0]) >= 3
+
 
-def scale2box(points: npt.NDArray[np.float32], box: freud.box.Box) -> npt.NDArray[np.float32]:
+def scale2box(points: npt.NDArray[np.float32], box: "freud.box.Box") -> npt.NDArray[np.float32]:
     points[:, 0] = points[:, 0] * box.Lx
     points[:, 1] = points[:, 1] * box.Ly
     points[:, 2] = points[:, 2] * box.Lz
     return points
 
 
-def clusters(points: npt.NDArray[np.float32], box: freud.box.Box, r_max: float) -> npt.NDArray[np.uint32]:
+def clusters(points: npt.NDArray[np.float32], box: "freud.box.Box", r_max: float) -> npt.NDArray[np.uint32]:
     points = box.wrap(points)
     system = freud.AABBQuery(box, points)
     cl = freud.cluster.Cluster()  # type: ignore
@@ -38,9 +50,155 @@ def distribution(data: npt.NDArray[np.uint32], N: int) -> npt.NDArray[np.uint32]
     return mat[1:]
 
 
-def get_dist(data: npt.NDArray[np.float32], N: int, box: freud.box.Box) -> npt.NDArray[np.uint32]:
+def to_sparse(dist: npt.NDArray) -> Tuple[npt.NDArray[np.int64], npt.NDArray]:
+    nz = np.flatnonzero(dist)
+    return (nz + 1).astype(np.int64), dist[nz]
+
+
+def to_dense(sizes: npt.NDArray, values: npt.NDArray, N: int, dtype=np.uint32) -> npt.NDArray:
+    sizes = np.asarray(sizes, dtype=np.int64)
+    keep = sizes <= N
+    mat = np.zeros(N, dtype=dtype)
+    mat[sizes[keep] - 1] = np.asarray(values)[keep]
+    return mat
+
+
+def get_dist(data: npt.NDArray[np.float32], N: int, box: "freud.box.Box") -> npt.NDArray[np.uint32]:
     return distribution(clusters(scale2box(data, box), box, 1.5), N)
 
 
+R_MAX = 1.5  # cluster bond length
+SKIN = 0.3  # extra range of kept neighbour list
+BACKENDS = ("freud", "cells")
+DEFAULT_BACKEND = "freud" if freud is not None else "cells"
+
+
+def check_backend(backend: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown clustering backend: {backend}")
+    if backend == "freud" and freud is None:
+        raise RuntimeError("Clustering backend 'freud' requested, but freud is not installed, use 'cells' backend instead")
+
+
+def make_box(bdims, backend: str = DEFAULT_BACKEND):
+    check_backend(backend)
+    if backend == "cells":
+        return cells.Box.from_box(bdims)
+    return freud.box.Box.from_box(np.array(bdims))
+
+
+class ClusterEngine():
+    def __init__(self, box, N: int, r_max: float = R_MAX, skin: float = SKIN, cutoffs: Optional[List[float]] = None, min_neighbors: int = 0, backend: str = DEFAULT_BACKEND) -> None:
+        check_backend(backend)
+        self.box = box
+        self.backend = backend
+        self.N = N
+        # several cutoffs share one neighbour query at the largest of them
+        self.cutoffs: List[float] = list(cutoffs) if cutoffs else [r_max]
+        self.r_max = max(self.cutoffs)
+        self.min_neighbors = min_neighbors
+        self.skin = skin
+        if backend == "freud":
+            self.cl = freud.cluster.Cluster()  # type: ignore
+            self.cl_props = freud.cluster.ClusterProperties()  # type: ignore
+        # positions at last neighbour search and pairs found within r_max + skin
+        self.ref: Union[npt.NDArray[np.float32], None] = None
+        self.qi: npt.NDArray[np.uint32] = np.zeros(0, dtype=np.uint32)
+        self.pi: npt.NDArray[np.uint32] = np.zeros(0, dtype=np.uint32)
+        self.frames = 0
+        self.builds = 0
+
+    def _stale(self, points: npt.NDArray[np.float32]) -> bool:
+        # list stays valid while no atom moved more than half of skin
+        if self.ref is None or self.ref.shape != points.shape:
+            return True
+        moved = self.box.wrap(points - self.ref)
+        return bool(np.max(np.einsum('ij,ij->i', moved, moved)) > (self.skin / 2)**2)
+
+    def _build(self, points: npt.NDArray[np.float32]) -> None:
+        if self.backend == "cells":
+            # both directions kept, as freud query returns them
+            i, j, _ = cells.pairs(points, self.box, self.r_max + self.skin)
+            self.qi = np.concatenate((i, j)).astype(np.uint32)
+            self.pi = np.concatenate((j, i)).astype(np.uint32)
+            self.ref = points.copy()
+            self.builds += 1
+            return
+        query = freud.AABBQuery(self.box, points).query(points, {'mode': 'ball', 'r_min': 0, 'exclude_ii': True, 'r_max': self.r_max + self.skin})
+        nlist = query.toNeighborList()
+        self.qi = np.array(nlist.query_point_indices, dtype=np.uint32)
+        self.pi = np.array(nlist.point_indices, dtype=np.uint32)
+        self.ref = points.copy()
+        self.builds += 1
+
+    def _bonded(self, n: int, keep: npt.NDArray[np.bool_]) -> npt.NDArray[np.bool_]:
+        if self.min_neighbors > 0:
+            # atoms with too few neighbours are not bonded to anything
+            bonded = np.bincount(self.qi[keep], minlength=n) >= self.min_neighbors
+            keep = keep & bonded[self.qi] & bonded[self.pi]
+        return keep
+
+    def _sizes(self, points: npt.NDArray[np.float32], keep: npt.NDArray[np.bool_], bonds: npt.NDArray, dist: npt.NDArray[np.float64]) -> npt.NDArray[np.uint32]:
+        keep = self._bonded(len(points), keep)
+        if self.backend == "cells":
+            return cells.cluster_sizes(len(points), self.qi[keep], self.pi[keep]).astype(np.uint32)
+        nlist = freud.locality.NeighborList.from_arrays(len(points), len(points), self.qi[keep], self.pi[keep], bonds[keep] if FREUD_VECTORS else dist[keep])
+        self.cl.compute((self.box, points), neighbors=nlist)
+        self.cl_props.compute((self.box, points), self.cl.cluster_idx)
+        return np.array(self.cl_props.sizes)
+
+    def _neighbours(self, points: npt.NDArray[np.float32]) -> Tuple[npt.NDArray[np.float32], npt.NDArray, npt.NDArray[np.float64]]:
+        # wrapped points, bond vectors from query point to point and their lengths
+        points = self.box.wrap(points)
+        if self._stale(points):
+            self._build(points)
+        self.frames += 1
+        bonds = self.box.wrap(points[self.pi] - points[self.qi])
+        return points, bonds, np.sqrt(np.einsum('ij,ij->i', bonds, bonds))
+
+    def all_clusters(self, points: npt.NDArray[np.float32]) -> List[npt.NDArray[np.uint32]]:
+        points, bonds, dist = self._neighbours(points)
+        return [self._sizes(points, dist < cutoff, bonds, dist) for cutoff in self.cutoffs]
+
+    def clusters(self, points: npt.NDArray[np.float32]) -> npt.NDArray[np.uint32]:
+        return self.all_clusters(points)[0]
+
+    def dists(self, data: npt.NDArray[np.float32]) -> List[npt.NDArray[np.uint32]]:
+        # one distribution per cutoff, in order they were given
+        return [distribution(sizes, self.N) for sizes in self.all_clusters(scale2box(data, self.box))]
+
+    def batch_dists(self, datas: List[npt.NDArray[np.float32]]) -> List[List[npt.NDArray[np.uint32]]]:
+        # distributions per cutoff for every frame; cells backend clusters all frames in one union-find pass per cutoff
+        if self.backend != "cells" or len(datas) < 2:
+            return [self.dists(data) for data in datas]
+        n = len(datas[0])
+        edges: List[List[Tuple[npt.NDArray, npt.NDArray]]] = [[] for _ in self.cutoffs]
+        for data in datas:
+            _, _, dist = self._neighbours(scale2box(data, self.box))
+            for c, cutoff in enumerate(self.cutoffs):
+                keep = self._bonded(n, dist < cutoff)
+                edges[c].append((self.qi[keep], self.pi[keep]))
+        sizes = [cells.batch_cluster_sizes(n, e) for e in edges]
+        return [[distribution(sizes[c][f], self.N) for c in range(len(self.cutoffs))] for f in range(len(datas))]
+
+    def __call__(self, data: npt.NDArray[np.float32]) -> npt.NDArray[np.uint32]:
+        return self.dists(data)[0]
+
+
+VALIDATE_TOLERANCE = 1e-3  # share of atoms allowed in differently sized clusters
+
+
+def validate(data: npt.NDArray[np.float32], N: int, bdims, cutoffs: List[float], min_neighbors: int = 0) -> Union[float, None]:
+    # compares cells backend against freud on one frame, None when freud is missing
+    # gives worst over cutoffs share of atoms in clusters found by one backend only
+    if freud is None:
+        return None
+    points = np.array(data, dtype=np.float32)
+    ref = ClusterEngine(make_box(bdims, "freud"), N, cutoffs=cutoffs, min_neighbors=min_neighbors, backend="freud").dists(points.copy())
+    got = ClusterEngine(make_box(bdims, "cells"), N, cutoffs=cutoffs, min_neighbors=min_neighbors, backend="cells").dists(points.copy())
+    sizes = np.arange(1, N + 1, dtype=np.int64)
+    return max(float(np.abs(a.astype(np.int64) - b.astype(np.int64)) @ sizes) / N for a, b in zip(ref, got))
+
+
 if __name__ == "__main__":
     pass
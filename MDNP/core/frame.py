@@ -0,0 +1,65 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 14:37:50
+
+from typing import Union
+
+import numpy as np
+from numpy import typing as npt
+
+
+class Normaliser:
+    def __init__(self) -> None:
+        self.buf: Union[npt.NDArray, None] = None
+        self.order: npt.NDArray[np.intp] = np.zeros(0, dtype=np.intp)
+        self.dense: bool = False
+        self._rows: npt.NDArray[np.intp] = np.zeros(0, dtype=np.intp)
+        self._seen: npt.NDArray[np.bool_] = np.zeros(0, dtype=np.bool_)
+
+    def _reserve(self, n: int) -> None:
+        if len(self._rows) != n:
+            self._rows = np.arange(n, dtype=np.intp)
+            self._seen = np.zeros(n, dtype=np.bool_)
+            self.order = np.zeros(n, dtype=np.intp)
+
+    def permutation(self, ids: npt.NDArray) -> npt.NDArray[np.intp]:
+        ids = ids.astype(np.int64, copy=False)
+        n = len(ids)
+        self._reserve(n)
+        self.dense = False
+        if n != 0 and int(ids.min()) == 1 and int(ids.max()) == n:
+            self._seen[:] = False
+            self._seen[ids - 1] = True
+            self.dense = bool(self._seen.all())
+        if self.dense:
+            # LAMMPS IDs are a permutation of 1..N, so row with ID k goes to k-1
+            self.order[ids - 1] = self._rows
+        else:
+            self.order[:] = np.argsort(ids, kind='stable')
+        return self.order
+
+    def __call__(self, arr: npt.NDArray, id_col: int = 0) -> npt.NDArray:
+        ids = arr[:, id_col].astype(np.int64, copy=False)
+        self.permutation(ids)
+        if self.buf is None or self.buf.shape != arr.shape or self.buf.dtype != arr.dtype:
+            self.buf = np.empty_like(arr)
+        if self.dense:
+            self.buf[ids - 1] = arr
+        else:
+            np.take(arr, self.order, axis=0, out=self.buf)
+        return self.buf
+
+    def gather(self, col: npt.NDArray, out: Union[npt.NDArray, None] = None) -> npt.NDArray:
+        if out is None:
+            return np.take(col, self.order, axis=0)
+        return np.take(col, self.order, axis=0, out=out)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:27:00
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from numpy import typing as npt
+
+from .. import constants as cs
+from . import stats, distribution
+from .frame import Normaliser
+from .reader import Reader
+from .timers import Timers
+from .adios_wrap import adser
+
+
+# sizes, counts, temperatures by size (None if not computed) and total temperature
+Result = Tuple[npt.NDArray, npt.NDArray, Union[npt.NDArray, None], float]
+
+MATR_COLUMNS = (2, 5)  # positions
+
+
+def read_task(cwd: Path, ino: int, storages: Dict[str, Dict[str, int]], begin: int, end: int, dtype=None, copy: bool = False, timers: Optional[Timers] = None) -> Generator[Tuple[int, int, npt.NDArray], None, None]:
+    # steps of one task, numbered from ino; reader reuses its buffers, so copy frames kept after next read
+    timers = timers if timers is not None else Timers()
+    stepnd = ino
+    for storage in storages.keys():
+        with Reader((cwd / storage).as_posix(), random_access=True) as reader:
+            for _ in reader.steps(storages[storage][cs.fields.begin], storages[storage][cs.fields.end]):
+                with timers("read"):
+                    raw = reader.read_columns(cs.lcf.lammps_dist, begin, end, dtype)
+                    real_timestep = int(reader.read_one(cs.lcf.real_timestep))
+                yield stepnd, real_timestep, raw.copy() if copy else raw
+                stepnd += 1
+
+
+def simp_rows(norm: Normaliser, raw: npt.NDArray, with_temps: bool, ndim: int = 3) -> List[Result]:
+    return [stats.summary(norm(raw), with_temps, ndim)]
+
+
+def matr_batch(engine: distribution.ClusterEngine, arrs: List[npt.NDArray[np.float32]]) -> List[List[Result]]:
+    # one result per cutoff for every frame, frames clustered together
+    return [[distribution.to_sparse(dist) + (None, 0.0) for dist in dists] for dists in engine.batch_dists(arrs)]
+
+
+def batches(items: Iterable[Tuple], size: int) -> Generator[Tuple[List[Tuple]], None, None]:
+    # consecutive items grouped by size, as one argument tuples for ordered()
+    group: List[Tuple] = []
+    for item in items:
+        group.append(item)
+        if len(group) >= size:
+            yield (group,)
+            group = []
+    if group:
+        yield (group,)
+
+
+def validated(items: Iterable[Tuple[int, int, npt.NDArray]], params: Dict[str, Any], logger: logging.Logger) -> Generator[Tuple[int, int, npt.NDArray], None, None]:
+    # cells backend is checked against freud on first frame where it is installed
+    for k, item in enumerate(items):
+        if params[cs.fields.backend] == "cells" and k == 0:
+            valid = distribution.validate(item[2], params[cs.fields.N_atoms], params[cs.fields.dimensions], params[cs.fields.cutoffs], params[cs.fields.min_neighbors])
+            # bonds within rounding of cutoff may still be decided differently, so small difference is tolerated
+            if valid is None:
+                logger.info("Freud is not installed, cells backend is not checked")
+            elif valid > distribution.VALIDATE_TOLERANCE:
+                raise RuntimeError(f"Cells backend differs from freud on first frame of step {item[0]}: {valid:.2%} of atoms are in differently sized clusters")
+            elif valid > 0:
+                logger.warning(f"Cells backend differs from freud on first frame: {valid:.2%} of atoms are in differently sized clusters, within tolerance")
+            else:
+                logger.info("Cells backend matches freud on first frame")
+        yield item
+
+
+def open_storage(fp: Path, logger: logging.Logger, temps: bool, channels: int = 1, timesteps: bool = True) -> adser:
+    # without timesteps, for pipelines not carrying them, catalog marks them unknown
+    adout = adser(logger)
+    logger.debug("Declaring variables")
+    adout.declare_arr(cs.lcf.worker_step, 1, np.int64)
+    adout.declare_arr(cs.lcf.mat_step, 1, np.int64)
+    if timesteps:
+        adout.declare_arr(cs.lcf.real_timestep, 1, np.int64)
+    adout.declare_sparse(cs.lcf.sizes, np.int64)
+    adout.declare_sparse(cs.lcf.size_counts, np.int64)
+    if temps:
+        adout.declare_arr(cs.lcf.tot_temp, 1, np.float32)
+        adout.declare_sparse(cs.lcf.cl_temps, np.float64)
+    # additional cutoffs go to sizes.1, size_counts.1, ...
+    for c in range(1, channels):
+        adout.declare_sparse(f"{cs.lcf.sizes}.{c}", np.int64)
+        adout.declare_sparse(f"{cs.lcf.size_counts}.{c}", np.int64)
+    logger.info(f"Trying to create adios storage: {fp.as_posix()}")
+    adout.open(fp.as_posix())
+    return adout
+
+
+def write_row(adout: adser, worker_step: int, step: int, timestep: Optional[int], results: List[Result]) -> None:
+    sizes, counts, temps, total = results[0]
+    adout.begin_step()
+    adout.wr_array(cs.lcf.worker_step, np.array(worker_step))
+    adout.wr_array(cs.lcf.mat_step, np.array(step))
+    if timestep is not None:
+        adout.wr_array(cs.lcf.real_timestep, np.array(timestep))
+    adout.wr_sparse(cs.lcf.sizes, sizes)
+    adout.wr_sparse(cs.lcf.size_counts, counts)
+    if temps is not None:
+        adout.wr_array(cs.lcf.tot_temp, np.array(total))
+        adout.wr_sparse(cs.lcf.cl_temps, temps)
+    for c in range(1, len(results)):
+        adout.wr_sparse(f"{cs.lcf.sizes}.{c}", results[c][0])
+        adout.wr_sparse(f"{cs.lcf.size_counts}.{c}", results[c][1])
+    adout.end_step()
+
+
+if __name__ == "__main__":
+    pass
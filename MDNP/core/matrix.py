@@ -0,0 +1,142 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:14:41
+
+import json
+from pathlib import Path
+from typing import Dict, Generator, List, Any, Tuple, Union
+
+import numpy as np
+import pandas as pd  # type: ignore
+from numpy import typing as npt
+from numpy.lib.format import open_memmap
+
+
+CHUNK = 65536  # rows per chunk when converting
+
+
+def meta_path(path: Path) -> Path:
+    return path.with_suffix(".json")
+
+
+def create(path: Path, rows: int, cols: int, dtype) -> npt.NDArray:
+    # column 0 holds step number, remaining ones hold row data
+    return open_memmap(path, mode='w+', dtype=np.dtype(dtype), shape=(rows, cols + 1))
+
+
+def finish(path: Path, mat: npt.NDArray, meta: Dict[str, Any]) -> None:
+    mat.flush()  # type: ignore
+    meta = dict(meta)
+    meta["rows"] = int(mat.shape[0])
+    meta["cols"] = int(mat.shape[1] - 1)
+    meta["dtype"] = mat.dtype.str
+    if mat.shape[0] != 0:
+        meta["steps"] = [int(mat[0, 0]), int(mat[-1, 0])]
+    with open(meta_path(path), "w") as fp:
+        json.dump(meta, fp, indent=4)
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx.npz")
+
+
+class StepIndex():
+    def __init__(self, steps: npt.NDArray, pos: npt.NDArray, cols: int) -> None:
+        order = np.argsort(steps, kind='stable')
+        self.steps: npt.NDArray[np.int64] = np.asarray(steps, dtype=np.int64)[order]
+        # row number for binary matrix, byte offset of line for text one
+        self.pos: npt.NDArray[np.int64] = np.asarray(pos, dtype=np.int64)[order]
+        self.cols: int = cols
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def find(self, step: int) -> int:
+        k = int(np.searchsorted(self.steps, step))
+        if k == len(self.steps) or self.steps[k] != step:
+            raise KeyError(f"Step {step} not found in matrix")
+        return int(self.pos[k])
+
+
+def build_index(path: Path) -> StepIndex:
+    if path.suffix == ".npy":
+        mat = np.load(path, mmap_mode='r')
+        return StepIndex(mat[:, 0], np.arange(mat.shape[0]), mat.shape[1] - 1)
+    steps: List[int] = []
+    offsets: List[int] = []
+    cols = 0
+    offset = 0
+    with open(path, "rb") as fp:
+        for line in fp:
+            if line.strip():
+                first = line.split(b',', 1)[0]
+                steps.append(int(float(first)))
+                offsets.append(offset)
+                if cols == 0:
+                    cols = line.count(b',')
+            offset += len(line)
+    return StepIndex(np.array(steps, dtype=np.int64), np.array(offsets, dtype=np.int64), cols)
+
+
+def step_index(path: Path) -> StepIndex:
+    # cached beside matrix, rebuilt when matrix changes
+    st = path.stat()
+    if (ifp := index_path(path)).exists():
+        with np.load(ifp) as data:
+            if int(data["mtime"]) == st.st_mtime_ns and int(data["size"]) == st.st_size:
+                return StepIndex(data["steps"], data["pos"], int(data["cols"]))
+    index = build_index(path)
+    try:
+        with open(ifp, "wb") as fp:
+            np.savez(fp, steps=index.steps, pos=index.pos, cols=index.cols, mtime=st.st_mtime_ns, size=st.st_size)
+    except OSError:
+        pass
+    return index
+
+
+def read_line(path: Path, offset: int, dtype=np.float64) -> npt.NDArray:
+    with open(path, "rb") as fp:
+        fp.seek(offset)
+        return np.array(fp.readline().split(b','), dtype=np.float64).astype(dtype)
+
+
+def load(path: Path) -> Tuple[npt.NDArray, Dict[str, Any]]:
+    if path.suffix != ".npy":
+        raise ValueError(f"Only binary matrix can be loaded, text one {path.as_posix()} is read with chunks()")
+    meta: Dict[str, Any] = {}
+    if (mfp := meta_path(path)).exists():
+        with open(mfp, "r") as fp:
+            meta = json.load(fp)
+    return np.load(path, mmap_mode='r'), meta
+
+
+def chunks(path: Path, rows: int = CHUNK) -> Generator[npt.NDArray, None, None]:
+    # blocks of rows, old text matrix is streamed and never held in memory whole
+    if path.suffix == ".npy":
+        mat = np.load(path, mmap_mode='r')
+        for i in range(0, mat.shape[0], rows):
+            yield mat[i:i + rows]
+        return
+    with pd.read_csv(path, header=None, chunksize=rows) as reader:
+        for block in reader:
+            yield block.to_numpy()
+
+
+def to_csv(path: Path, outfile: Union[Path, None] = None) -> Path:
+    mat, _ = load(path)
+    outfile = path.with_suffix(".csv") if outfile is None else outfile
+    fmt = '%d' if np.issubdtype(mat.dtype, np.integer) else '%.8g'
+    with open(outfile, "w") as fp:
+        for i in range(0, mat.shape[0], CHUNK):
+            np.savetxt(fp, mat[i:i + CHUNK], fmt=fmt, delimiter=',')
+    return outfile
+
+
+if __name__ == "__main__":
+    pass
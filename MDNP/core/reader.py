@@ -0,0 +1,143 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 14:47:13
+
+from pathlib import Path
+from typing import Dict, Tuple, Union, Generator, Any
+
+import adios2  # type: ignore
+import numpy as np
+from numpy import typing as npt
+
+
+adios_types: Dict[str, Any] = {
+    "double": np.float64,
+    "float": np.float32,
+    "int64_t": np.int64,
+    "uint64_t": np.uint64,
+    "int32_t": np.int32,
+    "uint32_t": np.uint32,
+    "int16_t": np.int16,
+    "uint16_t": np.uint16,
+    "int8_t": np.int8,
+    "uint8_t": np.uint8,
+}
+
+
+class Reader:
+    def __init__(self, storage: Union[Path, str], random_access: bool = False) -> None:
+        self.storage = Path(storage)
+        self.random_access = random_access
+        self.step = 0
+        self.adios = adios2.ADIOS()  # type: ignore
+        self.rdIO = self.adios.DeclareIO("BPFile_R")
+        self.bufs: Dict[Tuple[Any, Any, Tuple[int, ...]], npt.NDArray] = {}
+        self.opened = False
+
+    def open(self) -> "Reader":
+        if self.opened:
+            raise RuntimeError("Attempt to open storage in second time")
+        mode = adios2.Mode.ReadRandomAccess if self.random_access else adios2.Mode.Read  # type: ignore
+        self.engine = self.rdIO.Open(self.storage.as_posix(), mode)
+        self.opened = True
+        return self
+
+    def close(self) -> None:
+        if self.opened:
+            self.engine.Close()
+            self.opened = False
+
+    def __enter__(self) -> "Reader":
+        return self.open()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def steps(self, begin: int = 0, count: Union[int, None] = None) -> Generator[int, None, None]:
+        if self.random_access:
+            # jump straight to the first step instead of advancing the engine through skipped ones
+            total = self.engine.Steps()
+            end = total if count is None else min(begin + count, total)
+            for step in range(begin, end):
+                self.step = step
+                yield step
+            return
+        while self.engine.BeginStep() == adios2.StepStatus.OK:  # type: ignore
+            step = self.step = self.engine.CurrentStep()
+            if step >= begin:
+                if count is not None and step >= begin + count:
+                    self.engine.EndStep()
+                    return
+                yield step
+            self.engine.EndStep()
+
+    def seek(self, step: int) -> None:
+        if not self.random_access:
+            raise RuntimeError("Seeking is supported only in random access mode")
+        self.step = step
+
+    def has(self, name: str) -> bool:
+        return self.rdIO.InquireVariable(name) is not None
+
+    def _shape(self, var) -> Tuple[int, ...]:
+        # shape of variable-size arrays differs from step to step
+        if self.random_access:
+            return tuple(var.Shape(self.step))
+        return tuple(var.Shape())
+
+    def _inquire(self, name: str):
+        var = self.rdIO.InquireVariable(name)
+        if var is None:
+            raise KeyError(f"Variable '{name}' cannot be found in {self.storage.as_posix()}")
+        if self.random_access:
+            var.SetStepSelection([self.step, 1])
+        return var
+
+    def _buffer(self, tag: Any, dtype, shape: Tuple[int, ...]) -> npt.NDArray:
+        key = (tag, np.dtype(dtype), shape)
+        if (buf := self.bufs.get(key)) is None:
+            buf = np.empty(shape, dtype=dtype)
+            self.bufs[key] = buf
+        return buf
+
+    def read_one(self, name: str):
+        var = self._inquire(name)
+        buf = self._buffer(name, adios_types.get(var.Type(), np.float64), (1,))
+        self.engine.Get(var, buf, adios2.Mode.Sync)  # type: ignore
+        return buf[0].item()
+
+    def read_array(self, name: str, dtype=None) -> npt.NDArray:
+        var = self._inquire(name)
+        shape = self._shape(var)
+        native = adios_types.get(var.Type(), np.float64)
+        buf = self._buffer(name, native, shape)
+        self.engine.Get(var, buf, adios2.Mode.Sync)  # type: ignore
+        if dtype is None or np.dtype(dtype) == buf.dtype:
+            return buf
+        out = self._buffer(name, dtype, shape)
+        np.copyto(out, buf, casting='unsafe')
+        return out
+
+    def read_columns(self, name: str, begin: int = 0, end: Union[int, None] = None, dtype=None) -> npt.NDArray:
+        var = self._inquire(name)
+        rows, cols = self._shape(var)
+        end = cols if end is None else end
+        var.SetSelection([[0, begin], [rows, end - begin]])
+        native = adios_types.get(var.Type(), np.float64)
+        buf = self._buffer((name, begin), native, (rows, end - begin))
+        self.engine.Get(var, buf, adios2.Mode.Sync)  # type: ignore
+        if dtype is None or np.dtype(dtype) == buf.dtype:
+            return buf
+        out = self._buffer((name, begin), dtype, (rows, end - begin))
+        np.copyto(out, buf, casting='unsafe')
+        return out
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:28:08
+
+from typing import Callable, Tuple, Union
+
+import numpy as np
+from numpy import typing as npt
+
+
+def cluster_index(cl_ids: npt.NDArray) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.int64]]:
+    cl_ids = np.asarray(cl_ids).astype(np.int64, copy=False)
+    if cl_ids.size == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int64)
+    top = int(cl_ids.max())
+    if int(cl_ids.min()) >= 0 and top <= 4 * cl_ids.size:
+        # LAMMPS cluster IDs are atom IDs, so they are bounded by N and O(N) bincount is enough
+        counts = np.bincount(cl_ids)
+        present = np.flatnonzero(counts)
+        remap = np.zeros(top + 1, dtype=np.intp)
+        remap[present] = np.arange(len(present), dtype=np.intp)
+        return remap[cl_ids], counts[present].astype(np.int64)
+    _, inverse, counts = np.unique(cl_ids, return_inverse=True, return_counts=True)
+    return inverse.ravel().astype(np.intp, copy=False), counts.astype(np.int64)
+
+
+def size_counts(cl_sizes: npt.NDArray[np.int64]) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    counts = np.bincount(cl_sizes)
+    sizes = np.flatnonzero(counts)
+    return sizes.astype(np.int64), counts[sizes].astype(np.int64)
+
+
+def size_distribution(cl_sizes: npt.NDArray[np.int64], N: int) -> npt.NDArray[np.uint32]:
+    return np.bincount(cl_sizes, minlength=N + 1)[1:N + 1].astype(np.uint32)
+
+
+def ke_by_size(kes: npt.NDArray, inverse: npt.NDArray[np.intp], cl_sizes: npt.NDArray[np.int64]) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    # size of the cluster every atom belongs to, so one weighted pass over atoms is enough
+    atom_sizes = cl_sizes[inverse]
+    atoms = np.bincount(atom_sizes)
+    sizes = np.flatnonzero(atoms)
+    ke_sums = np.bincount(atom_sizes, weights=kes, minlength=len(atoms))[sizes]
+    atoms = atoms[sizes].astype(np.int64)
+    return sizes.astype(np.int64), atoms, ke_sums
+
+
+def ndofs(atoms: Union[npt.NDArray[np.int64], int], ndim: int) -> Union[npt.NDArray[np.int64], int]:
+    return (atoms - 1) * ndim
+
+
+def ndofs_nonmpi(atoms: Union[npt.NDArray[np.int64], int], ndim: int) -> Union[npt.NDArray[np.int64], int]:
+    # count used by nonmpi simp, kept so its temperatures do not change
+    return atoms * (ndim - 1)
+
+
+def temperature(ke: Union[npt.NDArray[np.float64], float], dofs: Union[npt.NDArray[np.int64], int]) -> npt.NDArray[np.float64]:
+    ke = np.asarray(ke, dtype=np.float64)
+    dofs = np.asarray(dofs)
+    # clusters without degrees of freedom (single monomer) are assumed to have zero temperature
+    return np.divide(2 * ke, dofs, out=np.zeros(np.broadcast(ke, dofs).shape, dtype=np.float64), where=dofs > 0)
+
+
+def cluster_temperatures(kes: npt.NDArray[np.float64], inverse: npt.NDArray[np.intp], cl_sizes: npt.NDArray[np.int64], ndim: int, dofs: Callable = ndofs) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.float64], float]:
+    sizes, atoms, ke_sums = ke_by_size(kes, inverse, cl_sizes)
+    counts = atoms // sizes
+    cl_temps = temperature(ke_sums, dofs(atoms, ndim))
+    total_temp = float(temperature(np.sum(kes), dofs(len(kes), ndim)))
+    return sizes, counts, cl_temps, total_temp
+
+
+def kinetic_energies(masses: npt.NDArray, vels: npt.NDArray) -> npt.NDArray[np.float64]:
+    vels = np.asarray(vels, dtype=np.float64)
+    # masses are truncated to integers, as they always were
+    return np.asarray(masses).astype(np.int64) * np.einsum('ij,ij->i', vels, vels) / 2
+
+
+def summary(arr: npt.NDArray, with_temps: bool, ndim: int = 3, dofs: Callable = ndofs) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], Union[npt.NDArray[np.float64], None], float]:
+    # normalised frame columns: id, cluster id, mass, velocities
+    inverse, cl_sizes = cluster_index(arr[:, 1])
+    if not with_temps:
+        return size_counts(cl_sizes) + (None, 0.0)
+    kes = kinetic_energies(arr[:, 2], arr[:, 3:6])
+    return cluster_temperatures(kes, inverse, cl_sizes, ndim, dofs)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 14:55:56
+
+import os
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd  # type: ignore
+from numpy import typing as npt
+
+
+class TemperatureSeries():
+    def __init__(self, times: npt.NDArray, temps: npt.NDArray) -> None:
+        # only first record of repeated time is kept, as linear scan found it
+        times = np.asarray(times, dtype=np.int64)
+        order = np.argsort(times, kind='stable')
+        _, first = np.unique(times[order], return_index=True)
+        self.times: npt.NDArray[np.int64] = times[order][first]
+        self.temps: npt.NDArray[np.float64] = np.asarray(temps, dtype=np.float64)[order][first]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _left(self, times: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        return np.minimum(np.searchsorted(self.times, times), len(self.times) - 1)
+
+    def exact(self, times: Union[npt.NDArray, int]) -> npt.NDArray[np.float64]:
+        times = np.asarray(times, dtype=np.int64)
+        k = self._left(times)
+        if not np.all(found := self.times[k] == times):
+            raise KeyError(f"Temperature for time {int(times[~found].flat[0])} not found")
+        return self.temps[k]
+
+    def nearest(self, times: Union[npt.NDArray, int], tol: int = 1) -> npt.NDArray[np.float64]:
+        # NaN where no record is within tol
+        times = np.asarray(times, dtype=np.int64)
+        k = self._left(times)
+        prev = np.maximum(k - 1, 0)
+        k = np.where(np.abs(self.times[prev] - times) < np.abs(self.times[k] - times), prev, k)
+        return np.where(np.abs(self.times[k] - times) <= tol, self.temps[k], np.nan)
+
+    def interp(self, times: Union[npt.NDArray, int]) -> npt.NDArray[np.float64]:
+        return np.interp(np.asarray(times, dtype=np.float64), self.times, self.temps)
+
+    def time_of(self, temperature: float) -> int:
+        return int(self.times[np.argmin(np.abs(self.temps - temperature))])
+
+
+def cache_path(path: Path) -> Path:
+    return path.with_name(path.name + ".npz")
+
+
+def load(path: Path) -> TemperatureSeries:
+    # parsed text log is cached beside it, rebuilt when log changes
+    st = path.stat()
+    if (cfp := cache_path(path)).exists():
+        with np.load(cfp) as data:
+            if int(data["mtime"]) == st.st_mtime_ns and int(data["size"]) == st.st_size:
+                return TemperatureSeries(data["times"], data["temps"])
+    log = pd.read_csv(path, header=None)
+    series = TemperatureSeries(log[0].to_numpy(dtype=np.int64), log[1].to_numpy(dtype=np.float64))
+    try:
+        # several ranks may build it at once, so file is replaced atomically
+        tmp = cfp.with_name(f"{cfp.name}.{os.getpid()}")
+        with open(tmp, "wb") as fp:
+            np.savez(fp, times=series.times, temps=series.temps, mtime=st.st_mtime_ns, size=st.st_size)
+        os.replace(tmp, cfp)
+    except OSError:
+        pass
+    return series
+
+
+if __name__ == "__main__":
+    pass
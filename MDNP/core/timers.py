@@ -0,0 +1,105 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:03:21
+
+import json
+import math
+import time
+import threading
+from pathlib import Path
+from contextlib import nullcontext
+from typing import Dict, List, Any, Union
+
+
+NBINS = 40  # log2 bins starting from 1 us, last one collects everything longer
+NULL = nullcontext()
+
+
+class Timer():
+    def __init__(self, stage: "Stage") -> None:
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stage.add(time.perf_counter() - self.start)
+
+
+class Stage():
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.min: float = float("inf")
+        self.max: float = 0.0
+        self.hist: List[int] = [0] * NBINS
+        self.timer = Timer(self)
+        self.lock = threading.Lock()
+
+    def add(self, dt: float) -> None:
+        with self.lock:
+            self._add(dt)
+
+    def _add(self, dt: float) -> None:
+        self.count += 1
+        self.total += dt
+        self.min = min(self.min, dt)
+        self.max = max(self.max, dt)
+        self.hist[min(NBINS - 1, max(0, int(math.log2(dt * 1e6 + 1))))] += 1
+
+    def asdict(self) -> Dict[str, Any]:
+        return {"count": self.count, "total": self.total, "min": self.min if self.count else 0.0, "max": self.max, "hist": self.hist}
+
+
+class Timers():
+    def __init__(self, enabled: bool = False, folder: Union[Path, None] = None) -> None:
+        self.enabled: bool = enabled
+        self.folder: Union[Path, None] = folder
+        self.stages: Dict[str, Stage] = {}
+
+    def __call__(self, name: str):
+        if not self.enabled:
+            return NULL
+        if (stage := self.stages.get(name)) is None:
+            stage = self.stages.setdefault(name, Stage())
+        # shared timer is kept for main thread, pool threads need their own
+        return stage.timer if threading.current_thread() is threading.main_thread() else Timer(stage)
+
+    def asdict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stage.asdict() for name, stage in self.stages.items()}
+
+    def dump(self, name: Union[str, int]) -> None:
+        if not self.enabled or self.folder is None:
+            return
+        with open(self.folder / f"timings.{name}.json", "w") as fp:
+            json.dump(self.asdict(), fp, indent=4)
+
+
+def summarize(ranks: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    summary: Dict[str, Dict[str, Any]] = {}
+    for rank, stages in enumerate(ranks):
+        for name, st in stages.items():
+            if (sm := summary.get(name)) is None:
+                sm = {"count": 0, "total": 0.0, "min": float("inf"), "max": 0.0, "hist": [0] * NBINS, "ranks": {}}
+                summary[name] = sm
+            sm["count"] += st["count"]
+            sm["total"] += st["total"]
+            sm["min"] = min(sm["min"], st["min"])
+            sm["max"] = max(sm["max"], st["max"])
+            sm["hist"] = [a + b for a, b in zip(sm["hist"], st["hist"])]
+            sm["ranks"][str(rank)] = st["total"]
+    for sm in summary.values():
+        sm["mean"] = sm["total"] / sm["count"] if sm["count"] else 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    pass
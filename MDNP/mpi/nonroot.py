@@ -6,12 +6,13 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 20-09-2023 04:39:19
+# Last modified: 18-10-2026 14:46:02
 
 from .utils import Role
 from .utils import STATE
 from .sense import workers
-from .utils_mpi import MC, MPI_TAGS
+from .utils_mpi import MC, MPI_TAGS, send_state
+from ..core.timers import Timers
 
 
 def w4sb(sts: MC):  # wait for second barrier
@@ -21,6 +22,8 @@ def w4sb(sts: MC):  # wait for second barrier
 
 
 def goto(sts: MC):
+    timings, folder = sts.mpi_comm.bcast(None)
+    sts.timers = Timers(timings, sts.cwd / folder)
     sts.logger.info("Waiting for distribution barrier")
     sts.mpi_comm.Barrier()
     sts.logger.info("Barrier released")
@@ -60,7 +63,7 @@ def goto(sts: MC):
         mpi_comm.send(obj=mrole, dest=0, tag=MPI_TAGS.ONLINE)
         sts.logger = sts.logger.getChild('killed')
         w4sb(sts)
-        mpi_comm.send(obj=STATE.EXITED, dest=0, tag=MPI_TAGS.STATE)
+        send_state(mpi_comm, STATE.EXITED)
         return 0
     # one threaded
     elif mrole == Role.one_thread:
@@ -6,7 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 14-04-2024 12:27:50
+# Last modified: 18-10-2026 15:16:06
 
 import json
 import argparse
@@ -14,27 +14,18 @@ import logging
 from pathlib import Path
 from typing import List, Dict, Any
 
-import adios2
 import numpy as np
 
 from .utils_mpi import MC
+from .transport import CREDITS
+from ..core.timers import Timers
+from ..core import distribution
 from .. import constants as cs
 from .sense.root.group import group_run
 from .sense.root.one_threaded import one_threaded
 from .sense.root.new import new
 from .sense.root import new_simp
-from ..utils import bearbeit
-
-
-def storage_rsolve(cwd: Path, _storages: List[str]) -> Dict[str, int]:
-    storages: Dict[str, int] = {}
-    for storage in _storages:
-        file = cwd / storage
-        if not file.exists():
-            raise FileNotFoundError(f"Storage {file.as_posix()} cannot be found")
-        with adios2.open(file.as_posix(), 'r') as reader_c:  # type: ignore
-            storages[storage] = reader_c.steps()
-    return storages
+from ..utils import bearbeit, storage_rsolve
 
 
 def main(sts: MC):
@@ -43,6 +34,15 @@ def main(sts: MC):
     parser = argparse.ArgumentParser(description='Generate cluster distribution matrix from ADIOS2 LAMMPS data.')
     parser.add_argument('--debug', action='store_true', help='Debug, prints only parsed arguments')
     parser.add_argument('--mode', action='store', type=int, default=4, help='Mode to run')
+    parser.add_argument('--credits', action='store', type=int, default=CREDITS, help='Frames allowed to be in flight on one channel of group run')
+    parser.add_argument('--timings', action='store_true', help='Collect per-stage timings on all ranks')
+    parser.add_argument('--per-rank', action='store_true', help='Keep storage of every worker instead of one written by root')
+    parser.add_argument('--cutoffs', action='store', type=float, nargs='+', default=[distribution.R_MAX], help='Cluster bond lengths, matrix is built for each of them from one neighbour search (mode 3)')
+    parser.add_argument('--min-neighbors', action='store', type=int, default=0, help='Atoms with fewer neighbours are not bonded into clusters')
+    parser.add_argument('--backend', action='store', type=str, choices=distribution.BACKENDS, default=distribution.DEFAULT_BACKEND, help='Clustering backend, cells one needs only numpy; freud if installed by default')
+    parser.add_argument('--threads', action='store', type=int, default=1, help='Frames processed concurrently by every worker rank (modes 3-5)')
+    parser.add_argument('--batch', action='store', type=int, default=1, help='Frames clustered together in one union-find pass by matrix workers, cells backend (mode 3)')
+    parser.add_argument('--chunk', action='store', type=int, default=None, help='Steps per chunk for dynamic scheduling, static distribution if not set')
     args = parser.parse_args()
 
     sts.logger.info(f"Envolved args: {args}")
@@ -67,6 +67,11 @@ def main(sts: MC):
     son[cs.fields.volume] = np.prod(bdims)
     son[cs.fields.dimensions] = list(bdims)
     son[cs.fields.storages] = storages
+    son[cs.fields.cutoffs] = args.cutoffs
+    son[cs.fields.min_neighbors] = args.min_neighbors
+    son[cs.fields.backend] = args.backend
+    son[cs.fields.threads] = args.threads
+    son[cs.fields.batch] = max(1, args.batch)
     sts.logger.debug("Updating info file")
     with open(data_file, 'w') as fp:
         json.dump(son, fp)
@@ -74,25 +79,28 @@ def main(sts: MC):
     data_processing_folder: Path = (sts.cwd / son[cs.fields.data_processing_folder])
     data_processing_folder.mkdir(exist_ok=True)
 
+    sts.mpi_comm.bcast((args.timings, son[cs.fields.data_processing_folder]))
+    sts.timers = Timers(args.timings, data_processing_folder)
+
     if args.mode == 1:
         sts.logger.info("Running group run")
         sts.logger = sts.logger.getChild('group')
-        return group_run(sts, son, 3)
+        return group_run(sts, son, 3, credits=args.credits)
     elif args.mode == 2:
         sts.logger = sts.logger.getChild('one')
         sts.logger.info("Running one threaded run")
-        return one_threaded(sts, son, 1)
+        return one_threaded(sts, son, 1, chunk=args.chunk)
     elif args.mode == 3:
         sts.logger = sts.logger.getChild('new')
         sts.logger.info("Running new run")
-        return new(sts, son, 1)
+        return new(sts, son, 1, chunk=args.chunk, per_rank=args.per_rank)
     elif args.mode == 4:
         sts.logger = sts.logger.getChild('simp')
         sts.logger.info("Running simple run")
-        return new_simp.new(sts, son, 1)
+        return new_simp.new(sts, son, 1, chunk=args.chunk, per_rank=args.per_rank)
     elif args.mode == 5:
         sts.logger = sts.logger.getChild('simp')
         sts.logger.info("Running simple run")
-        return new_simp.new(sts, son, 1)
+        return new_simp.new(sts, son, 1, chunk=args.chunk, per_rank=args.per_rank)
     else:
         sts.logger.error(f"Unknown mode {args.mode}")
@@ -6,9 +6,10 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 05-01-2024 16:50:30
+# Last modified: 18-10-2026 14:46:02
 
 
+import json
 import logging
 import os
 from pathlib import Path
@@ -21,8 +22,9 @@ from mpi4py import MPI
 from .root import main
 from .nonroot import goto
 from . import utils_mpi as UM
-from .utils_mpi import MPISanityError, MC, MPI_TAGS
+from .utils_mpi import MPISanityError, MC
 from .utils import STATE
+from ..core.timers import summarize
 
 
 def root(sts: MC):
@@ -32,7 +34,14 @@ def root(sts: MC):
         raise MPISanityError("MPI root sanity doesn't passed")
     else:
         sts.logger.info("Passed mpi root sanity check")
-        return main(sts)
+        ret = main(sts)
+        if sts.timers.enabled:
+            sts.logger.info("Gathering timings")
+            sts.timers.dump(sts.mpi_rank)
+            summary = summarize(sts.mpi_comm.gather(sts.timers.asdict(), root=0))  # type: ignore
+            with open(sts.timers.folder / "timings.json", "w") as fp:  # type: ignore
+                json.dump(summary, fp, indent=4)
+        return ret
 
 
 def nonroot(sts: MC):
@@ -43,10 +52,14 @@ def nonroot(sts: MC):
     else:
         try:
             sts.logger.info("Passed mpi nonroot sanity check")
-            return goto(sts)
+            ret = goto(sts)
+            if sts.timers.enabled:
+                sts.timers.dump(sts.mpi_rank)
+                sts.mpi_comm.gather(sts.timers.asdict(), root=0)
+            return ret
         except Exception:
             sts.logger.exception("Something went wrong, trying to stop all")
-            sts.mpi_comm.send(obj=STATE.EXCEPTION, dest=0, tag=MPI_TAGS.STATE)
+            UM.send_state(sts.mpi_comm, STATE.EXCEPTION)
 
 
 def mpi_wrap():
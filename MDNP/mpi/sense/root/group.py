@@ -6,7 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 11-09-2023 18:24:14
+# Last modified: 18-10-2026 15:05:45
 
 import json
 from typing import Dict, Union
@@ -15,11 +15,13 @@ import numpy as np
 
 from ...utils import Role
 from .... import constants as cs
-from .utils import after_ditribution, distribute
+from .utils import after_ditribution
+from ....utils import distribute
 from ...utils_mpi import MC, MPI_TAGS
+from ...transport import CREDITS
 
 
-def group_run(sts: MC, params: Dict, nv: int):
+def group_run(sts: MC, params: Dict, nv: int, credits: int = CREDITS):
     mpi_comm, mpi_size = sts.mpi_comm, sts.mpi_size
 
     sts.logger.info("Distribution")
@@ -78,8 +80,10 @@ def group_run(sts: MC, params: Dict, nv: int):
     for i in range(thread_num):
         # sts.logger.debug("Sending storage for ")
         mpi_comm.send(obj=wd[str(i)], dest=nv + thread_len * i, tag=MPI_TAGS.SERV_DATA)  # storages for readers
-        mpi_comm.send(obj=(params[cs.fields.N_atoms], params[cs.fields.dimensions]), dest=nv + thread_len * i + 1, tag=MPI_TAGS.SERV_DATA)  # data for proceeders
+        mpi_comm.send(obj=(params[cs.fields.N_atoms], params[cs.fields.dimensions], params[cs.fields.backend]), dest=nv + thread_len * i + 1, tag=MPI_TAGS.SERV_DATA)  # data for proceeders
         mpi_comm.send(obj=params, dest=nv + thread_len * i + 2, tag=MPI_TAGS.SERV_DATA)  # something for proceeders
+        for j in range(thread_len):
+            mpi_comm.send(obj=credits, dest=nv + thread_len * i + j, tag=MPI_TAGS.SERV_DATA_1)  # frames in flight per channel
 
     # [mpi_comm.send(obj=wd[str(i)], dest=i, tag=MPI_TAGS.SERV_DATA) for i in readers]
     # [mpi_comm.send(obj=(params[cs.fields.N_atoms], params[cs.fields.dimensions]), dest=i, tag=MPI_TAGS.SERV_DATA) for i in proceeders]
@@ -6,56 +6,96 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 17-09-2023 22:19:21
+# Last modified: 18-10-2026 15:13:00
 
-import csv
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Union, Any
+from contextlib import ExitStack
+from typing import List, Dict, Union, Any, Optional, Tuple
 
-import adios2  # type: ignore
 import numpy as np
+from numpy import typing as npt
 
 from ...utils import Role
 from .... import constants as cs
-from .utils import distribute, gw2c
+from ....core import distribution, matrix
+from ....core.reader import Reader
+from .utils import gw2c, Scheduler
+from ....utils import distribute
+from ....core.assembly import Assembler
 from ...utils_mpi import MC, MPI_TAGS
+from ....core.adios_wrap import adser
+
+
+def index_steps(readers: List[Reader]) -> List[Tuple[int, int, int]]:
+    index: List[Tuple[int, int, int]] = []
+    for k, reader in enumerate(readers):
+        for local in reader.steps():
+            index.append((int(reader.read_one(cs.lcf.mat_step)), k, local))
+    # storages may hold interleaved chunks of steps when scheduled dynamically
+    index.sort()
+    return index
+
+
+def read_dist(reader: Reader, cut: int) -> npt.NDArray:
+    if reader.has(cs.lcf.mat_dist):
+        return reader.read_array(cs.lcf.mat_dist)[:cut]
+    # sparse storage holds only non-zero sizes and their counts
+    return distribution.to_dense(reader.read_array(cs.lcf.sizes), reader.read_array(cs.lcf.size_counts), cut)
+
+
+def read_padded(reader: Reader, name: str, cut: int) -> npt.NDArray:
+    arr = reader.read_array(name)[:cut]
+    if arr.size == cut:
+        return arr
+    return np.pad(arr, (0, cut - arr.size), 'constant', constant_values=(0))
 
 
 def gen_matrix(cwd: Path, params: Dict, storages: List[Path], cut: int, logger: logging.Logger):
-    output_csv_fp: Path = cwd / params[cs.fields.data_processing_folder] / cs.files.cluster_distribution_matrix
-    logger.debug(f"Trying to open {output_csv_fp.as_posix()}")
-    with output_csv_fp.open("w") as csv_file:
-        writer = csv.writer(csv_file, delimiter=',')
+    output_fp: Path = cwd / params[cs.fields.data_processing_folder] / cs.files.matrix
+    with ExitStack() as stack:
+        readers = [stack.enter_context(Reader(storage, random_access=True)) for storage in storages]
+        logger.debug("Indexing steps")
+        index = index_steps(readers)
+        logger.debug(f"Trying to create {output_fp.as_posix()}")
+        mat = matrix.create(output_fp, len(index), cut, np.uint32)
         logger.debug("Starting loop")
-        for storage in storages:
-            with adios2.open(storage.as_posix(), 'r') as reader:  # type: ignore
-                for step in reader:
-                    stee: int = step.read(cs.lcf.mat_step)
-                    dist = step.read(cs.lcf.mat_dist)
-                    writer.writerow(np.hstack([stee, dist[:cut]]).astype(dtype=np.uint32).flatten('A'))
+        for row, (stee, k, local) in enumerate(index):
+            readers[k].seek(local)
+            mat[row, 0] = stee
+            mat[row, 1:] = read_dist(readers[k], cut)
+        matrix.finish(output_fp, mat, {"cut": cut})
 
     logger.debug("Success")
 
 
-def after_new(sts: MC, nv: int, params: Dict[str, Any]):
+def after_new(sts: MC, nv: int, params: Dict[str, Any], scheduler: Optional[Scheduler] = None):
     cwd, mpi_comm, mpi_size = sts.cwd, sts.mpi_comm, sts.mpi_size
 
-    gw2c(sts, nv)
+    # rows are streamed by workers and assembled while they are still running
+    adout: Optional[adser] = None
+    ntb_fp: Path = cwd / params[cs.fields.data_processing_folder] / cs.files.mat_storage
+    if not params[cs.fields.per_rank]:
+        # root writes rows of all workers to one storage in order of global step
+        adout = adser(sts.logger)
+    assembler = Assembler(temps=False, adout=adout, channels=len(params[cs.fields.cutoffs]))
+    if adout is not None:
+        sts.logger.info(f"Trying to create adios storage: {ntb_fp.as_posix()}")
+        adout.open(ntb_fp.as_posix())
+    gw2c(sts, nv, scheduler, assembler)
 
     sts.logger.info("Gathering info about new matrix storages")
     storages = []
-    max_sizes = []
     for i in range(nv, mpi_size):
         storage: Path
         max_cluster_size: int
         storage, max_cluster_size = mpi_comm.recv(source=i, tag=MPI_TAGS.SERV_DATA_3)
         storages.append((i, storage))
-        max_sizes.append(max_cluster_size)
 
-    storages.sort(key=lambda x: x[1])
-    _storages = [storage[1] for storage in storages]
+    storages.sort(key=lambda x: x[0])
+    where = dict(storages) if params[cs.fields.per_rank] else {-1: ntb_fp}
+    _storages = list(where.values())
 
     params[cs.fields.matrix_storages] = [storage.as_posix() for storage in _storages]
 
@@ -64,14 +104,16 @@ def after_new(sts: MC, nv: int, params: Dict[str, Any]):
     with open(data_file, 'w') as fp:
         json.dump(params, fp)
 
-    sts.logger.info("Generating csv matrix")
-    gen_matrix(cwd, params, _storages, max(max_sizes)+1, sts.logger.getChild('matrix_gen'))
+    sts.logger.info("Writing matrix")
+    with sts.timers("gen_matrix"):
+        assembler.finish(cwd / params[cs.fields.data_processing_folder])
+        assembler.catalog(where).save(cwd / params[cs.fields.data_processing_folder] / cs.files.catalog)
 
     sts.logger.info("Exiting...")
     return 0
 
 
-def new(sts: MC, params: Dict, nv: int):
+def new(sts: MC, params: Dict, nv: int, chunk: Optional[int] = None, per_rank: bool = False):
     mpi_comm, mpi_size = sts.mpi_comm, sts.mpi_size
 
     thread_num = mpi_size - nv
@@ -81,15 +123,22 @@ def new(sts: MC, params: Dict, nv: int):
     for i in range(thread_num):
         mpi_comm.send(obj=Role.matr, dest=i + nv, tag=MPI_TAGS.DISTRIBUTION)
 
-    sts.logger.info("Distributing storages")
-    wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = distribute(params[cs.fields.storages], thread_num)
-    sts.logger.debug(json.dumps(wd, indent=4))
+    scheduler: Optional[Scheduler] = None
+    if chunk is None:
+        sts.logger.info("Distributing storages")
+        wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = distribute(params[cs.fields.storages], thread_num)
+        sts.logger.debug(json.dumps(wd, indent=4))
+    else:
+        sts.logger.info(f"Scheduling storages dynamically by chunks of {chunk} steps")
+        scheduler = Scheduler(params[cs.fields.storages], chunk)
 
+    params[cs.fields.per_rank] = per_rank
     sts.logger.info("Sending needed data for workers")
     for i in range(thread_num):
-        mkl = (wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages])
+        # no assignment means that worker must request chunks from root
+        mkl = None if scheduler is not None else (wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages])
         mpi_comm.send(obj=mkl, dest=nv + i, tag=MPI_TAGS.SERV_DATA_1)
         mpi_comm.send(obj=params, dest=nv + i, tag=MPI_TAGS.SERV_DATA_2)
 
     sts.logger = sts.logger.getChild('after_new')
-    return after_new(sts, nv, params)
+    return after_new(sts, nv, params, scheduler)
@@ -6,61 +6,80 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 30-12-2023 00:09:54
+# Last modified: 18-10-2026 15:13:21
 
-import csv
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Union, Any
+from contextlib import ExitStack
+from typing import List, Dict, Union, Any, Optional
 
-import adios2  # type: ignore
 import numpy as np
 
 from ...utils import Role
 from .... import constants as cs
-from .utils import distribute, gw2c
+from ....core import matrix
+from ....core.reader import Reader
+from .new import index_steps, read_dist, read_padded
+from .utils import gw2c, Scheduler
+from ....utils import distribute
+from ....core.assembly import Assembler
 from ...utils_mpi import MC, MPI_TAGS
+from ....core.adios_wrap import adser
 
 
 def gen_matrix(cwd: Path, params: Dict, storages: List[Path], cut: int, logger: logging.Logger) -> None:
-    output_csv_fp: Path = cwd / params[cs.fields.data_processing_folder] / cs.files.cluster_distribution_matrix
-    temps_csv_fp: Path = cwd / params[cs.fields.data_processing_folder] / "temps.csv"
-    logger.debug(f"Trying to open {output_csv_fp.as_posix()}")
-    with output_csv_fp.open("w") as csv_file, temps_csv_fp.open("w") as temps_file:
-        writer = csv.writer(csv_file, delimiter=",")
-        temper_wr = csv.writer(temps_file, delimiter=",")
+    output_fp: Path = cwd / params[cs.fields.data_processing_folder] / cs.files.matrix
+    temps_fp: Path = cwd / params[cs.fields.data_processing_folder] / cs.files.temps_matrix
+    with ExitStack() as stack:
+        readers = [stack.enter_context(Reader(storage, random_access=True)) for storage in storages]
+        logger.debug("Indexing steps")
+        index = index_steps(readers)
+        logger.debug(f"Trying to create {output_fp.as_posix()} and {temps_fp.as_posix()}")
+        mat = matrix.create(output_fp, len(index), cut, np.uint32)
+        # total temperature goes before per-size ones
+        temps = matrix.create(temps_fp, len(index), cut + 1, np.float32)
         logger.debug("Starting loop")
-        for storage in storages:
-            with adios2.open(storage.as_posix(), "r") as reader:  # type: ignore
-                for step in reader:
-                    stee: int = step.read(cs.lcf.mat_step)
-                    dist = step.read(cs.lcf.mat_dist)
-                    writer.writerow(np.hstack([stee, dist[:cut]]).astype(dtype=np.uint32).flatten())
-                    temps = step.read(cs.lcf.cl_temps)
-                    tot_temp = step.read(cs.lcf.tot_temp)
-                    temper_wr.writerow(np.hstack([stee, tot_temp, temps[:cut]]).astype(dtype=np.float32).flatten("A"))
+        for row, (stee, k, local) in enumerate(index):
+            reader = readers[k]
+            reader.seek(local)
+            mat[row, 0] = stee
+            mat[row, 1:] = read_dist(reader, cut)
+            temps[row, 0] = stee
+            temps[row, 1] = reader.read_one(cs.lcf.tot_temp)
+            temps[row, 2:] = read_padded(reader, cs.lcf.cl_temps, cut)
+        matrix.finish(output_fp, mat, {"cut": cut})
+        matrix.finish(temps_fp, temps, {"cut": cut})
 
     logger.debug("Success")
 
 
-def after_new(sts: MC, nv: int, params: Dict[str, Any]):
+def after_new(sts: MC, nv: int, params: Dict[str, Any], scheduler: Optional[Scheduler] = None, temps: bool = True):
     cwd, mpi_comm, mpi_size = sts.cwd, sts.mpi_comm, sts.mpi_size
 
-    gw2c(sts, nv)
+    # rows are streamed by workers and assembled while they are still running
+    adout: Optional[adser] = None
+    ntb_fp: Path = cwd / params[cs.fields.data_processing_folder] / cs.files.mat_storage
+    if not params[cs.fields.per_rank]:
+        # root writes rows of all workers to one storage in order of global step
+        adout = adser(sts.logger)
+    assembler = Assembler(temps=temps, adout=adout)
+    if adout is not None:
+        sts.logger.info(f"Trying to create adios storage: {ntb_fp.as_posix()}")
+        adout.open(ntb_fp.as_posix())
+    gw2c(sts, nv, scheduler, assembler)
 
     sts.logger.info("Gathering info about new matrix storages")
     storages = []
-    max_sizes = []
     for i in range(nv, mpi_size):
         storage: Path
         max_cluster_size: int
         storage, max_cluster_size = mpi_comm.recv(source=i, tag=MPI_TAGS.SERV_DATA_3)
         storages.append((i, storage))
-        max_sizes.append(max_cluster_size)
 
-    storages.sort(key=lambda x: x[1])
-    _storages = [storage[1] for storage in storages]
+    storages.sort(key=lambda x: x[0])
+    where = dict(storages) if params[cs.fields.per_rank] else {-1: ntb_fp}
+    _storages = list(where.values())
 
     params[cs.fields.matrix_storages] = [storage.as_posix() for storage in _storages]
 
@@ -69,32 +88,43 @@ def after_new(sts: MC, nv: int, params: Dict[str, Any]):
     with open(data_file, "w") as fp:
         json.dump(params, fp)
 
-    sts.logger.info("Generating csv matrix")
-    gen_matrix(cwd, params, _storages, max(max_sizes) + 1, sts.logger.getChild("matrix_gen"))
+    sts.logger.info("Writing matrix")
+    with sts.timers("gen_matrix"):
+        assembler.finish(cwd / params[cs.fields.data_processing_folder])
+        assembler.catalog(where).save(cwd / params[cs.fields.data_processing_folder] / cs.files.catalog)
 
     sts.logger.info("Exiting...")
     return 0
 
 
-def new(sts: MC, params: Dict, nv: int):
+def new(sts: MC, params: Dict, nv: int, chunk: Optional[int] = None, per_rank: bool = False):
     mpi_comm, mpi_size = sts.mpi_comm, sts.mpi_size
 
     thread_num = mpi_size - nv
     sts.logger.info(f"Workers count: {thread_num}")
 
     sts.logger.info("Sending info about roles")
+    # simp.simple workers compute temperatures, so temps.npy is written
+    role, temps = Role.simple, True
     for i in range(thread_num):
-        mpi_comm.send(obj=Role.simple, dest=i + nv, tag=MPI_TAGS.DISTRIBUTION)
-
-    sts.logger.info("Distributing storages")
-    wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = distribute(params[cs.fields.storages], thread_num)
-    sts.logger.debug(json.dumps(wd, indent=4))
-
+        mpi_comm.send(obj=role, dest=i + nv, tag=MPI_TAGS.DISTRIBUTION)
+
+    scheduler: Optional[Scheduler] = None
+    if chunk is None:
+        sts.logger.info("Distributing storages")
+        wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = distribute(params[cs.fields.storages], thread_num)
+        sts.logger.debug(json.dumps(wd, indent=4))
+    else:
+        sts.logger.info(f"Scheduling storages dynamically by chunks of {chunk} steps")
+        scheduler = Scheduler(params[cs.fields.storages], chunk)
+
+    params[cs.fields.per_rank] = per_rank
     sts.logger.info("Sending needed data for workers")
     for i in range(thread_num):
-        mkl = (wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages])
+        # no assignment means that worker must request chunks from root
+        mkl = None if scheduler is not None else (wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages])
         mpi_comm.send(obj=mkl, dest=nv + i, tag=MPI_TAGS.SERV_DATA_1)
         mpi_comm.send(obj=params, dest=nv + i, tag=MPI_TAGS.SERV_DATA_2)
 
     sts.logger = sts.logger.getChild("after_new")
-    return after_new(sts, nv, params)
+    return after_new(sts, nv, params, scheduler, temps)
@@ -6,18 +6,19 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 11-09-2023 18:14:22
+# Last modified: 18-10-2026 15:05:45
 
 import json
-from typing import Dict, Union
+from typing import Dict, Union, Optional
 
 from ...utils import Role
 from .... import constants as cs
-from .utils import after_ditribution, distribute
+from .utils import after_ditribution, Scheduler
+from ....utils import distribute
 from ...utils_mpi import MC, MPI_TAGS
 
 
-def one_threaded(sts: MC, params: Dict, nv: int):
+def one_threaded(sts: MC, params: Dict, nv: int, chunk: Optional[int] = None):
     mpi_comm, mpi_size = sts.mpi_comm, sts.mpi_size
 
     thread_num = mpi_size - nv
@@ -27,15 +28,21 @@ def one_threaded(sts: MC, params: Dict, nv: int):
     for i in range(thread_num):
         mpi_comm.send(obj=Role.one_thread, dest=i + nv, tag=MPI_TAGS.DISTRIBUTION)
 
-    sts.logger.info("Distributing storages")
-    wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = distribute(params[cs.fields.storages], thread_num)
-    sts.logger.debug(json.dumps(wd, indent=4))
+    scheduler: Optional[Scheduler] = None
+    if chunk is None:
+        sts.logger.info("Distributing storages")
+        wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = distribute(params[cs.fields.storages], thread_num)
+        sts.logger.debug(json.dumps(wd, indent=4))
+    else:
+        sts.logger.info(f"Scheduling storages dynamically by chunks of {chunk} steps")
+        scheduler = Scheduler(params[cs.fields.storages], chunk)
 
     sts.logger.info("Sending needed data for workers")
     for i in range(thread_num):
-        mkl = (wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages])
+        # no assignment means that worker must request chunks from root
+        mkl = None if scheduler is not None else (wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages])
         mpi_comm.send(obj=mkl, dest=nv + i, tag=MPI_TAGS.SERV_DATA_1)
         mpi_comm.send(obj=params, dest=nv + i, tag=MPI_TAGS.SERV_DATA_2)
 
     sts.logger = sts.logger.getChild('after_distrib')
-    return after_ditribution(sts, nv)
+    return after_ditribution(sts, nv, scheduler)
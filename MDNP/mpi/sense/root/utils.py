@@ -6,21 +6,39 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 18-09-2023 12:15:33
+# Last modified: 18-10-2026 15:28:14
 
 import time
 # import json
-from typing import Tuple, List, Dict, Union
+from typing import Tuple, List, Dict, Union, Optional
 
 import numpy as np
+from mpi4py import MPI
 
 from ...utils import Role
 from .... import constants as cs
+from ....core.assembly import Assembler
+from ....utils import distribute
 from ...utils_mpi import MC, MPI_TAGS
 from ...utils import COMMAND, STATE
 
 
-def gw2c(sts: MC, nv: int):  # gather, wait to complete
+class Scheduler:
+    def __init__(self, storages: Dict[str, int], chunk: int) -> None:
+        total = sum(list(storages.values()))
+        # same clamping as local runner, chunks are never empty
+        wd = distribute(storages, max(1, int(np.ceil(total / max(1, chunk)))))
+        self.chunks: List[Tuple[int, Dict[str, Dict[str, int]]]] = [(wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages]) for i in range(len(wd))]  # type: ignore
+        self.granted = 0
+
+    def grant(self) -> Union[Tuple[int, Dict[str, Dict[str, int]]], None]:
+        if self.granted == len(self.chunks):
+            return None
+        self.granted += 1
+        return self.chunks[self.granted - 1]
+
+
+def gw2c(sts: MC, nv: int, scheduler: Optional[Scheduler] = None, assembler: Optional[Assembler] = None):  # gather, wait to complete
     sts.logger = sts.logger.getChild('gw2c')
 
     sts.logger.info("Releasing distribution barrier")
@@ -28,50 +46,88 @@ def gw2c(sts: MC, nv: int):  # gather, wait to complete
     sts.logger.info("Distribution barrier released")
 
     sts.logger.info("Gathering information ")
-    response_array: List[Tuple[int, Role]] = []
-    while len(response_array) < sts.mpi_size - 1:
-        # sts.logger.debug("Gathering information ")
-        for i in range(1, sts.mpi_size):
-            if sts.mpi_comm.iprobe(source=i, tag=MPI_TAGS.ONLINE):
-                resp = sts.mpi_comm.recv(source=i, tag=MPI_TAGS.ONLINE)
-                sts.logger.debug(f"Received from {i}: {resp}")
-                response_array.append((i, resp))
+    ranks = list(range(1, sts.mpi_size))
+    online = [sts.mpi_comm.irecv(source=i, tag=MPI_TAGS.ONLINE) for i in ranks]
+    response_array: List[Tuple[int, Role]] = list(zip(ranks, MPI.Request.waitall(online)))
+    for i, resp in response_array:
+        sts.logger.debug(f"Received from {i}: {resp}")
 
     sts.logger.info("Releasing second barrier")
     sts.mpi_comm.Barrier()
     sts.logger.info("Second barrier released")
 
-    # states = {}
-
+    # persistent receives, one group per tag: STATE from every rank,
+    # REQUEST if scheduling dynamically and RESULT headers if assembling matrix
+    n = len(ranks)
+    groups: List[MPI_TAGS] = [MPI_TAGS.STATE]
+    if scheduler is not None:
+        groups.append(MPI_TAGS.REQUEST)
+    if assembler is not None:
+        groups.append(MPI_TAGS.RESULT)
+    bufs = np.zeros((len(groups), n, 5), dtype=np.int64)
+    reqs: List[MPI.Prequest] = [sts.mpi_comm.Recv_init(bufs[g, k, :1 if tag != MPI_TAGS.RESULT else 5], source=i, tag=tag) for g, tag in enumerate(groups) for k, i in enumerate(ranks)]
+    MPI.Prequest.Startall(reqs)
+    active = set(range(len(reqs)))
+
+    # workers that still stream results to root
+    streaming = set(range(nv, sts.mpi_size)) if assembler is not None else set()
+    payload = np.zeros(0, dtype=np.float64)
+    progress: Dict[int, int] = {}
     completed_threads: List[int] = []
-    # fl = True
-    # start = time.time()
-    sts.logger.info("Starting main loop, waiting for workers to complete with 20 sec sleep")
-    while len(completed_threads) < sts.mpi_size - nv:
-        for i in range(nv, sts.mpi_size):
-            if sts.mpi_comm.iprobe(source=i, tag=MPI_TAGS.STATE):
-                tstate = sts.mpi_comm.recv(source=i, tag=MPI_TAGS.STATE)
+    last_report = time.monotonic()
+    sts.logger.info("Starting main loop, waiting for workers to complete")
+    try:
+        while len(completed_threads) < sts.mpi_size - nv or streaming:
+            first = MPI.Request.Waitany(reqs)
+            if first == MPI.UNDEFINED:
+                raise RuntimeError("Nothing to wait for, but not all workers are completed")
+            done = [first] + (MPI.Request.Testsome(reqs) or [])
+            for j in done:
+                active.discard(j)
+                g, k = divmod(j, n)
+                i = ranks[k]
+                if groups[g] == MPI_TAGS.RESULT:
+                    step, size, kk, timestep, channel = (int(v) for v in bufs[g, k])
+                    if step < 0:
+                        streaming.discard(i)
+                        continue
+                    if payload.size != 1 + kk * size:
+                        payload = np.empty(1 + kk * size, dtype=np.float64)
+                    # payload follows its header immediately
+                    sts.mpi_comm.Recv(payload, source=i, tag=MPI_TAGS.RESULT)
+                    assembler.add(i, step, timestep, payload, size, kk, channel)  # type: ignore
+                    reqs[j].Start()
+                    active.add(j)
+                    continue
+                if groups[g] == MPI_TAGS.REQUEST:
+                    task = scheduler.grant()  # type: ignore
+                    sts.mpi_comm.send(obj=task, dest=i, tag=MPI_TAGS.GRANT)
+                    if task is not None:
+                        reqs[j].Start()
+                        active.add(j)
+                    continue
+                tstate = int(bufs[g, k, 0])
                 if tstate == STATE.EXITED:
                     completed_threads.append(i)
                     sts.logger.info(f"Rank {i} has been completed")
-                    # if len(completed_threads) == sts.mpi_size - m:
-                    #     with open(sts.cwd / cs.files.post_process_state, "w") as fp:
-                    #         json.dump(states, fp)
-                    #     fl = False
-                    #     break
                 elif tstate == STATE.EXCEPTION:
                     sts.logger.critical(f"Uncaught exception in rank: {i}, trying to stop all, exiting...")
                     for des in range(1, sts.mpi_size):
                         sts.mpi_comm.send(obj=COMMAND.EXIT, dest=des, tag=MPI_TAGS.COMMAND)
                     raise RuntimeError(f"Uncaught exception in rank: {i}, trying to stop all, exiting...")
-                # else:
-                #     states[str(i)][cs.cf.pp_state] = tstate
-        if not any([sts.mpi_comm.iprobe(source=i, tag=MPI_TAGS.STATE) for i in range(nv, sts.mpi_size)]):
-            time.sleep(20)
-        # if time.time() - start > 20:
-        #     with open(sts.cwd / cs.files.post_process_state, "w") as fp:
-        #         json.dump(states, fp)
-        #     start = time.time()
+                else:
+                    progress[i] = tstate
+                    reqs[j].Start()
+                    active.add(j)
+            if time.monotonic() - last_report > 20:
+                sts.logger.info(f"Progress: {progress}")
+                last_report = time.monotonic()
+    finally:
+        for j in active:
+            reqs[j].Cancel()
+            reqs[j].Wait()
+        for req in reqs:
+            req.Free()
 
     sts.logger.info("All workers exited")
     sts.logger.info("Sending exit command to all ranks")
@@ -79,43 +135,10 @@ def gw2c(sts: MC, nv: int):  # gather, wait to complete
         sts.mpi_comm.send(obj=COMMAND.EXIT, dest=i, tag=MPI_TAGS.COMMAND)
 
 
-def after_ditribution(sts: MC, nv: int):
+def after_ditribution(sts: MC, nv: int, scheduler: Optional[Scheduler] = None):
 
-    gw2c(sts, nv)
+    gw2c(sts, nv, scheduler)
 
     sts.logger.info("Exiting...")
 
     return 0
-
-
-def distribute(storages: Dict[str, int], mm: int) -> Dict[str, Dict[str, Union[int, Dict[str, int]]]]:
-    ll = sum(list(storages.values()))
-    dp = np.linspace(0, ll - 1, mm + 1, dtype=int)
-    bp = dp
-    dp = dp[1:] - dp[:-1]
-    dp = np.vstack([bp[:-1].astype(dtype=int), np.cumsum(dp).astype(dtype=int)])
-    wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = {}
-    st = {}
-    for storage, value in storages.items():
-        st[storage] = value
-    ls = 0
-    for i, (begin_, end_) in enumerate(dp.T):
-        begin = int(begin_)
-        end = int(end_)
-        beg = 0 + ls
-        en = end - begin
-        wd[str(i)] = {cs.fields.number: begin, cs.fields.storages: {}}
-        for storage in list(st):
-            value = st[storage]
-            if en >= value:
-                wd[str(i)][cs.fields.storages][storage] = {cs.fields.begin: beg, cs.fields.end: value}  # type: ignore
-                en -= value
-                ls = 0
-                beg = 0
-                del st[storage]
-            elif en < value:
-                wd[str(i)][cs.fields.storages][storage] = {cs.fields.begin: beg, cs.fields.end: en}  # type: ignore
-                st[storage] -= en
-                ls += en
-                break
-    return wd
@@ -6,30 +6,25 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 17-09-2023 12:19:00
+# Last modified: 18-10-2026 15:16:06
 
-from typing import Dict
-from pathlib import Path
+from typing import Union
 
-import freud  # type: ignore
-import adios2  # type: ignore
 import numpy as np
 from numpy import typing as npt
 
 from ...utils import STATE
-from ...utils_mpi import MC, MPI_TAGS
+from ...utils_mpi import MC, MPI_TAGS, Progress, send_state
+from .utils import Task, ResultSender, ordered, PerThread, frames, local_storage
 from .... import constants as cs
-from ....core import distribution
+from ....core import distribution, kernels
 
 
 def thread(sts: MC):
-    cwd: Path
-    cwd, mpi_comm, mpi_rank = sts.cwd, sts.mpi_comm, sts.mpi_rank
+    mpi_comm = sts.mpi_comm
 
     sts.logger.info("Receiving storages")
-    ino: int
-    storages: Dict[str, Dict[str, int]]
-    ino, storages = mpi_comm.recv(source=0, tag=MPI_TAGS.SERV_DATA_1)
+    task: Union[Task, None] = mpi_comm.recv(source=0, tag=MPI_TAGS.SERV_DATA_1)
     sts.logger.info("Storages received")
 
     sts.logger.info("Receiving paramseters")
@@ -38,47 +33,44 @@ def thread(sts: MC):
 
     N_atoms: int = params[cs.fields.N_atoms]
     bdims: npt.NDArray[np.float32] = params[cs.fields.dimensions]
-    box = freud.box.Box.from_box(bdims)
-    sizes = np.arange(1, N_atoms + 1, 1)
+    backend: str = params[cs.fields.backend]
+    threads: int = params[cs.fields.threads]
+    batch: int = params[cs.fields.batch]
+    # every pool thread keeps its own neighbour list
+    engines = PerThread(lambda: distribution.ClusterEngine(distribution.make_box(bdims, backend), N_atoms, cutoffs=params[cs.fields.cutoffs], min_neighbors=params[cs.fields.min_neighbors], backend=backend))
+
+    def kernel(group):
+        with sts.timers("cluster"):
+            return kernels.matr_batch(engines(), [arr for _, _, arr in group])
 
     max_cluster_size = 0
     worker_counter = 0
-    ntb_fp: Path = cwd / params[cs.fields.data_processing_folder] / f"ntb.{mpi_rank}.bp"
-    sts.logger.info(f"Trying to create adios storage: {ntb_fp.as_posix()}")
-    with adios2.open(ntb_fp.as_posix(), 'w') as adout:  # type: ignore
-        sts.logger.info("Stating main loop")
-        storage: str
-        for storage in storages.keys():
-            storage_fp = (cwd / storage).as_posix()
-            with adios2.open(storage_fp, 'r') as reader:  # type: ignore
-                i = 0
-                for step in reader:
-                    if i < storages[storage][cs.fields.begin]:
-                        i += 1
-                        continue
-                    arr = step.read(cs.lcf.lammps_dist)
-                    arr = arr[:, 2:5].astype(dtype=np.float32)
-
-                    stepnd = worker_counter + ino
-
-                    dist = distribution.get_dist(arr, N_atoms, box)
-
-                    adout.write(cs.lcf.mat_step, np.array(stepnd))  # type: ignore
-                    adout.write(cs.lcf.mat_dist, dist, dist.shape, np.full(len(dist.shape), 0), dist.shape, end_step=True)  # type: ignore
-
-                    max_cluster_size = int(np.argmax(sizes[dist != 0]))
-
-                    worker_counter += 1
-                    mpi_comm.send(obj=worker_counter, dest=0, tag=MPI_TAGS.STATE)
-
-                    if i == storages[storage][cs.fields.end] + storages[storage][cs.fields.begin] - 1:  # type: ignore
-                        break
-
-                    i += 1
-
+    adout, ntb_fp = local_storage(sts, params, temps=False, channels=len(params[cs.fields.cutoffs]))
+    progress = Progress(mpi_comm)
+    results = ResultSender(mpi_comm)
+    sts.logger.info(f"Stating main loop with {threads} threads, {batch} frames per batch")
+    # frames held in batch or on pool outlive reader buffers
+    items = kernels.validated(frames(sts, task, *kernels.MATR_COLUMNS, np.float32, copy=threads > 1 or batch > 1), params, sts.logger)
+    for (group,), batch_rows in ordered(threads, kernel, kernels.batches(items, batch)):
+        for (stepnd, real_timestep, _), rows in zip(group, batch_rows):
+            if adout is not None:
+                with sts.timers("write"):
+                    kernels.write_row(adout, worker_counter, stepnd, real_timestep, rows)
+            with sts.timers("send"):
+                results.send_rows(stepnd, real_timestep, rows)
+
+            max_cluster_size = max(max_cluster_size, int(rows[0][0][-1]))
+
+            worker_counter += 1
+            progress(worker_counter)
+
+    if adout is not None:
+        adout.close()
+    results.close()
     sts.logger.info("Reached end")
-    mpi_comm.send(obj=STATE.EXITED, dest=0, tag=MPI_TAGS.STATE)
+    send_state(mpi_comm, STATE.EXITED)
     mpi_comm.send(obj=(ntb_fp, max_cluster_size), dest=0, tag=MPI_TAGS.SERV_DATA_3)
+    sts.logger.info(f"Neighbour list was built {sum(e.builds for e in engines.made)} times for {sum(e.frames for e in engines.made)} frames")
     sts.logger.info("Exiting...")
     return 0
 
@@ -6,7 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 11-09-2023 00:56:41
+# Last modified: 18-10-2026 15:01:46
 
 
 import os
@@ -18,13 +18,13 @@ os.environ['OPENBLAS_NUM_THREADS'] = '1'
 warnings.simplefilter("error")
 
 
-import freud
 import numpy as np
 from numpy import typing as npt
 
 from ...utils import STATE
 from ....core import distribution
-from ...utils_mpi import MC, MPI_TAGS
+from ...utils_mpi import MC, MPI_TAGS, Progress, send_state
+from ...transport import Sender, Receiver
 
 
 def proceed(sts: MC) -> Literal[0]:
@@ -33,40 +33,40 @@ def proceed(sts: MC) -> Literal[0]:
     sts.logger.info("Reveiving data from root")
     N: int
     bdims: npt.NDArray[np.float32]
-    N, bdims = mpi_comm.recv(source=0, tag=MPI_TAGS.SERV_DATA)
+    backend: str
+    N, bdims, backend = mpi_comm.recv(source=0, tag=MPI_TAGS.SERV_DATA)
+    credits: int = mpi_comm.recv(source=0, tag=MPI_TAGS.SERV_DATA_1)
     sts.logger.info("Data received")
 
-    box = freud.box.Box.from_box(np.array(bdims))
+    box = distribution.make_box(bdims, backend)
+    engine = distribution.ClusterEngine(box, N, backend=backend)
 
     reader_rank = mpi_rank - 1
     trt_rank = mpi_rank + 1
 
+    receiver = Receiver(mpi_comm, MPI_TAGS.DATA, np.float32, (3,))
+    to_treater = Sender(mpi_comm, trt_rank, MPI_TAGS.DATA, credits)
+    to_writer = Sender(mpi_comm, 2, MPI_TAGS.WRITE, credits)
+    progress = Progress(mpi_comm)
     sts.logger.info("Starting main loop")
-    while not mpi_comm.iprobe(source=reader_rank, tag=MPI_TAGS.SERVICE) or mpi_comm.iprobe(source=reader_rank, tag=MPI_TAGS.DATA):
+    while (frame := receiver.recv(reader_rank)) is not None:
         step: int
-        sender: int
         data: npt.NDArray[np.float32]
-        step, sender, data = mpi_comm.recv(source=reader_rank, tag=MPI_TAGS.DATA)
-        if sender != reader_rank:
-            pass
+        step, data = frame
 
-        dist = distribution.get_dist(data, N, box)
+        with sts.timers("cluster"):
+            dist = engine(data)
 
-        tpl = (step, dist)
+        with sts.timers("send"):
+            to_writer.send(step, dist)
+            to_treater.send(step, dist)
 
-        mpi_comm.send(obj=tpl, dest=2, tag=MPI_TAGS.WRITE)
-        mpi_comm.send(obj=tpl, dest=trt_rank, tag=MPI_TAGS.DATA)
+        progress(step)
 
-        mpi_comm.send(obj=step, dest=reader_rank, tag=MPI_TAGS.SERVICE)
-
-        mpi_comm.send(obj=step, dest=0, tag=MPI_TAGS.STATE)
-
-        # if mpi_comm.iprobe(source=reader_rank, tag=MPI_TAGS.SERVICE) and not mpi_comm.iprobe(source=reader_rank, tag=MPI_TAGS.DATA):
-        #     if mpi_comm.recv(source=reader_rank, tag=MPI_TAGS.SERVICE) == 1:
-        #         break
-
-    mpi_comm.send(obj=1, dest=trt_rank, tag=MPI_TAGS.SERVICE)
-    mpi_comm.send(obj=STATE.EXITED, dest=0, tag=MPI_TAGS.STATE)
+    to_writer.close()
+    to_treater.close()
+    send_state(mpi_comm, STATE.EXITED)
+    sts.logger.info(f"Neighbour list was built {engine.builds} times for {engine.frames} frames")
     sts.logger.info("Exiting...")
     return 0
 
@@ -6,25 +6,24 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 11-09-2023 18:06:15
+# Last modified: 18-10-2026 15:27:10
 
 
 import os
-from typing import Literal, Dict, Any
+from typing import Literal, Dict, Any, List, Tuple
 
 
 os.environ['OPENBLAS_NUM_THREADS'] = '1'
 
 
-import freud  # type: ignore
 import numpy as np
 from numpy import typing as npt
-import pandas as pd  # type: ignore
 
-from ....core import calc
+from ....core import calc, temperature, distribution
 from ...utils import STATE
 from .... import constants as cs
-from ...utils_mpi import MC, MPI_TAGS
+from ...utils_mpi import MC, MPI_TAGS, Progress, send_state
+from ...transport import Sender, Receiver
 
 
 def treat_mpi(sts: MC) -> Literal[0]:
@@ -32,6 +31,7 @@ def treat_mpi(sts: MC) -> Literal[0]:
 
     sts.logger.info("Receiving data from root")
     params: Dict[str, Any] = mpi_comm.recv(source=0, tag=MPI_TAGS.SERV_DATA)
+    credits: int = mpi_comm.recv(source=0, tag=MPI_TAGS.SERV_DATA_1)
     sts.logger.info("Data received")
 
     N_atoms: int = params[cs.fields.N_atoms]
@@ -41,39 +41,53 @@ def treat_mpi(sts: MC) -> Literal[0]:
 
     proc_rank = mpi_rank - 1
 
-    box = freud.box.Box.from_box(np.array(bdims))
-    volume = box.volume
+    volume = distribution.make_box(bdims, "cells").volume
     sizes: npt.NDArray[np.uint32] = np.arange(1, N_atoms + 1, dtype=np.uint64)
 
     sts.logger.info("Trying to read temperature file")
-    temperatures = pd.read_csv(cwd / cs.files.temperature, header=None)
-    temptime = temperatures[0].to_numpy(dtype=np.uint64)
-    temperatures = temperatures[1].to_numpy(dtype=np.float64)
-
+    series = temperature.load(cwd / cs.files.temperature)
+
+    receiver = Receiver(mpi_comm, MPI_TAGS.DATA, np.uint32)
+    to_writer = Sender(mpi_comm, 1, MPI_TAGS.WRITE, credits)
+    progress = Progress(mpi_comm)
+    km = 10
+    cache = calc.NvsCache(sizes, km)
+    # frames are treated in batches of as many as may be in flight, clamped as in Sender
+    limit = max(1, credits)
+    batch: List[Tuple[int, npt.NDArray[np.uint32]]] = []
     sts.logger.info("Stating main loop")
-    while not mpi_comm.iprobe(source=proc_rank, tag=MPI_TAGS.SERVICE) or mpi_comm.iprobe(source=proc_rank, tag=MPI_TAGS.DATA):
-        step: int
-        dist: npt.NDArray[np.uint32]
-        step, dist = mpi_comm.recv(source=proc_rank, tag=MPI_TAGS.DATA)
-
-        try:
-            km = 10
-            temp = temperatures[np.abs(temptime - int(step * dis)) <= 1][0]  # type: ignore
-            tow = calc.get_row(step, sizes, dist, temp, N_atoms, volume, dt, dis, km)
-        except Exception as e:
-            sts.logger.error(f"Exception at step: {step}")
-            sts.logger.exception(e)
-            sts.logger.error("Writing zeroes")
-            tow = np.zeros(10, dtype=np.float32)
-
-        mpi_comm.send(obj=tow, dest=1, tag=MPI_TAGS.WRITE)
-        mpi_comm.send(obj=step, dest=0, tag=MPI_TAGS.STATE)
-
-        # if mpi_comm.iprobe(source=proc_rank, tag=MPI_TAGS.SERVICE) and not mpi_comm.iprobe(source=proc_rank, tag=MPI_TAGS.DATA):
-        #     if mpi_comm.recv(source=proc_rank, tag=MPI_TAGS.SERVICE) == 1:
-        #         break
-
-    mpi_comm.send(obj=STATE.EXITED, dest=0, tag=MPI_TAGS.STATE)
+    while True:
+        frame = receiver.recv(proc_rank)
+        if frame is not None:
+            step: int
+            dist: npt.NDArray[np.uint32]
+            step, dist = frame
+            batch.append((step, dist.copy()))
+            progress(step)
+
+        if len(batch) >= limit or (frame is None and len(batch) != 0):
+            steps = np.array([b[0] for b in batch])
+            temps = series.nearest(steps * dis)
+            for step in steps[np.isnan(temps)]:
+                sts.logger.error(f"No temperature at step: {step}, writing zeroes")
+            with sts.timers("get_row"):
+                try:
+                    tows = calc.get_rows(steps, sizes, np.stack([b[1] for b in batch]), temps, N_atoms, volume, dt, dis, km, cache)
+                    tows[np.isnan(temps)] = 0
+                except Exception as e:
+                    sts.logger.error(f"Exception at steps: {steps[0]}..{steps[-1]}")
+                    sts.logger.exception(e)
+                    sts.logger.error("Writing zeroes")
+                    tows = np.zeros((len(steps), len(calc.get_spec())), dtype=np.float32)
+            for step, tow in zip(steps, tows):
+                to_writer.send(int(step), tow)
+            batch = []
+
+        if frame is None:
+            break
+
+    to_writer.close()
+    send_state(mpi_comm, STATE.EXITED)
     sts.logger.info("Exiting...")
     return 0
 
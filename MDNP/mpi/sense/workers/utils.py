@@ -0,0 +1,117 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:28:28
+
+import threading
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Deque, Dict, Iterable, List, Tuple, Union, Generator
+
+import numpy as np
+from numpy import typing as npt
+
+from ...utils import MPIComm
+from ...utils_mpi import MC, MPI_TAGS
+from .... import constants as cs
+from ....core import kernels
+from ....core.assembly import pack
+from ....core.adios_wrap import adser
+
+
+Task = Tuple[int, Dict[str, Dict[str, int]]]
+
+
+def assignments(sts: MC, task: Union[Task, None]) -> Generator[Task, None, None]:
+    if task is not None:
+        yield task
+        return
+    # dynamic scheduling: request chunks from root until it runs out of them
+    while True:
+        sts.mpi_comm.Send(np.array([sts.mpi_rank], dtype=np.int64), dest=0, tag=MPI_TAGS.REQUEST)
+        task = sts.mpi_comm.recv(source=0, tag=MPI_TAGS.GRANT)
+        if task is None:
+            return
+        yield task
+
+
+def frames(sts: MC, task: Union[Task, None], begin: int, end: int, dtype=None, copy: bool = False) -> Generator[Tuple[int, int, npt.NDArray], None, None]:
+    # reading stays on main thread, only kernels go to pool
+    for ino, storages in assignments(sts, task):
+        yield from kernels.read_task(sts.cwd, ino, storages, begin, end, dtype, copy, sts.timers)
+
+
+def ordered(threads: int, fn: Callable, items: Iterable[Tuple], window: int = 0) -> Generator[Tuple[Tuple, Any], None, None]:
+    # fn(*item) runs on pool, results come back in order of items
+    if threads <= 1:
+        for item in items:
+            yield item, fn(*item)
+        return
+    # items are pulled lazily, so at most window frames are held in memory
+    window = window if window > 0 else 2 * threads
+    pending: Deque[Tuple[Tuple, Future]] = deque()
+    with ThreadPoolExecutor(threads) as pool:
+        for item in items:
+            pending.append((item, pool.submit(fn, *item)))
+            if len(pending) >= window:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+class PerThread():
+    # one factory() object per pool thread, for helpers keeping state between frames
+    def __init__(self, factory: Callable) -> None:
+        self.factory = factory
+        self.local = threading.local()
+        self.made: List[Any] = []
+
+    def __call__(self) -> Any:
+        if (obj := getattr(self.local, "obj", None)) is None:
+            obj = self.local.obj = self.factory()
+            self.made.append(obj)
+        return obj
+
+
+def local_storage(sts: MC, params: Dict, temps: bool = True, channels: int = 1) -> Tuple[Union[adser, None], Union[Path, None]]:
+    # per-rank storage, only if root does not write consolidated one
+    if not params[cs.fields.per_rank]:
+        return None, None
+    sts.logger.info("Setting up ADIOS2 output")
+    ntb_fp: Path = sts.cwd / params[cs.fields.data_processing_folder] / f"ntb.{sts.mpi_rank}.bp"
+    return kernels.open_storage(ntb_fp, sts.logger, temps, channels), ntb_fp
+
+
+class ResultSender():
+    def __init__(self, mpi_comm: MPIComm) -> None:
+        self.mpi_comm: MPIComm = mpi_comm
+        self.header: npt.NDArray[np.int64] = np.zeros(5, dtype=np.int64)
+        self.payload: npt.NDArray[np.float64] = np.zeros(0, dtype=np.float64)
+
+    def send(self, step: int, timestep: int, sizes: npt.NDArray, counts: npt.NDArray, temps: Union[npt.NDArray, None] = None, total: float = 0.0, channel: int = 0) -> None:
+        # header: step, number of sizes, number of arrays in payload, real timestep, channel (cutoff number)
+        self.payload, n, k = pack(sizes, counts, temps, total, self.payload)
+        self.header[:] = (step, n, k, timestep, channel)
+        self.mpi_comm.Send(self.header, dest=0, tag=MPI_TAGS.RESULT)
+        self.mpi_comm.Send(self.payload, dest=0, tag=MPI_TAGS.RESULT)
+
+    def send_rows(self, step: int, timestep: int, results: List[kernels.Result]) -> None:
+        # one message per cutoff
+        for c, (sizes, counts, temps, total) in enumerate(results):
+            self.send(step, timestep, sizes, counts, temps, total, channel=c)
+
+    def close(self) -> None:
+        self.header[:] = (-1, 0, 0, 0, 0)
+        self.mpi_comm.Send(self.header, dest=0, tag=MPI_TAGS.RESULT)
+
+
+if __name__ == "__main__":
+    pass
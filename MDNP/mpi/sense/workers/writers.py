@@ -6,17 +6,18 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 11-09-2023 20:30:50
+# Last modified: 18-10-2026 15:27:00
 
 import csv
 from typing import List
 
-import adios2  # type: ignore
 import numpy as np
 from numpy import typing as npt
 
-from ...utils_mpi import MC, MPI_TAGS
+from ...utils_mpi import MC, MPI_TAGS, Progress
+from ...transport import Receiver, collect
 from .... import constants as cs
+from ....core import distribution, kernels
 
 
 def adios_writer(sts: MC):
@@ -30,17 +31,18 @@ def adios_writer(sts: MC):
     sts.logger.info("Folder received")
 
     sts.logger.info("Creating storage")
-    with adios2.open((cwd / folder / cs.files.mat_storage).as_posix(), 'w') as adout:  # type: ignore
-        sts.logger.info("Starting main loop")
-        while any([mpi_comm.iprobe(source=i, tag=MPI_TAGS.WRITE) for i in threads]) and not mpi_comm.iprobe(source=0, tag=MPI_TAGS.COMMAND):
-            for thread in threads:
-                if mpi_comm.iprobe(source=thread, tag=MPI_TAGS.WRITE):
-                    step: int
-                    arr: npt.NDArray[np.float32]
-                    step, arr = mpi_comm.recv(source=thread, tag=MPI_TAGS.WRITE)
-                    adout.write(cs.lcf.mat_step, np.array(step))  # type: ignore
-                    adout.write(cs.lcf.mat_dist, arr, arr.shape, np.full(len(arr.shape), 0), arr.shape, end_step=True)  # type: ignore
-                    mpi_comm.send(obj=step, dest=0, tag=MPI_TAGS.STATE)
+    # sparse, as other matrix storages; pipeline does not carry real timesteps
+    adout = kernels.open_storage(cwd / folder / cs.files.mat_storage, sts.logger, temps=False, timesteps=False)
+    receiver = Receiver(mpi_comm, MPI_TAGS.WRITE, np.uint32)
+    progress = Progress(mpi_comm)
+    sts.logger.info("Starting main loop")
+    step: int
+    arr: npt.NDArray[np.uint32]
+    for worker_step, (_, step, arr) in enumerate(collect(receiver, threads)):
+        with sts.timers("write"):
+            kernels.write_row(adout, worker_step, step, None, [distribution.to_sparse(arr) + (None, 0.0)])
+        progress(step)
+    adout.close()
 
     sts.logger.info("Exiting...")
     return 0
@@ -60,15 +62,16 @@ def csvWriter(sts: MC):
     ctr: int = 0
     with open((cwd / folder / cs.files.comp_data), "w") as csv_file:
         writer = csv.writer(csv_file, delimiter=',')
+        receiver = Receiver(mpi_comm, MPI_TAGS.WRITE, np.float32)
+        progress = Progress(mpi_comm)
         sts.logger.info("Starting main loop")
-        while any([mpi_comm.iprobe(source=i, tag=MPI_TAGS.WRITE) for i in threads]) and not mpi_comm.iprobe(source=0, tag=MPI_TAGS.COMMAND):
-            for thread in threads:
-                if mpi_comm.iprobe(source=thread, tag=MPI_TAGS.WRITE):
-                    data: npt.NDArray[np.float32] = mpi_comm.recv(source=thread, tag=MPI_TAGS.WRITE)
-                    writer.writerow(data)
-                    ctr += 1
-                    mpi_comm.send(obj=ctr, dest=0, tag=MPI_TAGS.STATE)
-                    csv_file.flush()
+        data: npt.NDArray[np.float32]
+        for _, _, data in collect(receiver, threads):
+            with sts.timers("write_csv"):
+                writer.writerow(data)
+            ctr += 1
+            progress(ctr)
+            csv_file.flush()
 
     sts.logger.info("Exiting...")
     return 0
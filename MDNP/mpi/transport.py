@@ -0,0 +1,123 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 14:44:32
+
+from typing import List, Tuple, Union, Generator
+
+import numpy as np
+from numpy import typing as npt
+from mpi4py import MPI
+
+from .utils import MPIComm
+from .utils_mpi import MPI_TAGS
+
+
+HEADER_SIZE = 2  # step, number of elements in payload
+EOS = -1  # step value in header that marks end of stream
+CREDITS = 8  # default number of frames allowed to be in flight on one channel
+
+
+class Sender():
+    def __init__(self, mpi_comm: MPIComm, dest: int, tag: int, credits: int = CREDITS, ack_tag: int = MPI_TAGS.CREDIT, depth: int = 2) -> None:
+        self.mpi_comm: MPIComm = mpi_comm
+        self.dest: int = dest
+        self.tag: int = tag
+        self.ack_tag: int = ack_tag
+        self.limit: int = max(1, credits)
+        self.credits: int = self.limit
+        self.depth: int = depth
+        self.headers: npt.NDArray[np.int64] = np.zeros((depth, HEADER_SIZE), dtype=np.int64)
+        self.payloads: List[Union[npt.NDArray, None]] = [None] * depth
+        self.reqs: List[List[MPI.Request]] = [[] for _ in range(depth)]
+        self.ack: npt.NDArray[np.int64] = np.zeros(1, dtype=np.int64)
+        self.slot: int = 0
+
+    def _wait_credit(self) -> None:
+        # blocks until receiver consumes one of the frames in flight
+        self.mpi_comm.Recv(self.ack, source=self.dest, tag=self.ack_tag)
+        self.credits += int(self.ack[0])
+
+    def send(self, step: int, arr: npt.NDArray) -> None:
+        while self.credits == 0:
+            self._wait_credit()
+        self.credits -= 1
+        # next frame is copied into free slot while previous one is still in flight
+        k = self.slot
+        MPI.Request.Waitall(self.reqs[k])
+        payload = self.payloads[k]
+        if payload is None or payload.shape != arr.shape or payload.dtype != arr.dtype:
+            payload = np.empty_like(arr)
+            self.payloads[k] = payload
+        np.copyto(payload, arr)
+        self.headers[k, 0] = step
+        self.headers[k, 1] = arr.size
+        # header and payload share tag, MPI keeps their order between two ranks
+        self.reqs[k] = [self.mpi_comm.Isend(self.headers[k], dest=self.dest, tag=self.tag),
+                        self.mpi_comm.Isend(payload, dest=self.dest, tag=self.tag)]
+        self.slot = (k + 1) % self.depth
+
+    def flush(self) -> None:
+        for k in range(self.depth):
+            MPI.Request.Waitall(self.reqs[k])
+            self.reqs[k] = []
+
+    def close(self) -> None:
+        self.flush()
+        self.mpi_comm.Send(np.array([EOS, 0], dtype=np.int64), dest=self.dest, tag=self.tag)
+        # collect credits of the last frames, so no acknowledgement is left unreceived
+        while self.credits < self.limit:
+            self._wait_credit()
+
+
+class Receiver():
+    def __init__(self, mpi_comm: MPIComm, tag: int, dtype, shape: Tuple[int, ...] = (), ack_tag: int = MPI_TAGS.CREDIT) -> None:
+        self.mpi_comm: MPIComm = mpi_comm
+        self.tag: int = tag
+        self.ack_tag: int = ack_tag
+        self.dtype = np.dtype(dtype)
+        self.shape: Tuple[int, ...] = shape  # trailing dimensions of payload
+        self.header: npt.NDArray[np.int64] = np.zeros(HEADER_SIZE, dtype=np.int64)
+        self.ack: npt.NDArray[np.int64] = np.ones(1, dtype=np.int64)
+        self.buf: npt.NDArray = np.zeros(0, dtype=self.dtype)
+        self.status = MPI.Status()
+        self.source: int = MPI.ANY_SOURCE
+
+    def recv(self, source: int = MPI.ANY_SOURCE) -> Union[Tuple[int, npt.NDArray], None]:
+        self.mpi_comm.Recv(self.header, source=source, tag=self.tag, status=self.status)
+        self.source = source = self.status.Get_source()
+        step, size = int(self.header[0]), int(self.header[1])
+        if step == EOS:
+            return None
+        if self.buf.size != size:
+            self.buf = np.empty(size, dtype=self.dtype)
+        self.mpi_comm.Recv(self.buf, source=source, tag=self.tag)
+        # frame is in our buffer now, sender may post the next one
+        self.mpi_comm.Send(self.ack, dest=source, tag=self.ack_tag)
+        if len(self.shape) == 0:
+            return step, self.buf
+        return step, self.buf.reshape((-1,) + self.shape)
+
+
+def collect(receiver: Receiver, sources: List[int]) -> Generator[Tuple[int, int, npt.NDArray], None, None]:
+    # frames from all sources until every one of them ends its stream or root sends command
+    status = MPI.Status()
+    ended = 0
+    while ended < len(sources):
+        receiver.mpi_comm.Probe(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
+        if status.Get_tag() == MPI_TAGS.COMMAND:
+            return
+        frame = receiver.recv(status.Get_source())
+        if frame is None:
+            ended += 1
+            continue
+        yield receiver.source, frame[0], frame[1]
+
+
+if __name__ == "__main__":
+    pass
@@ -6,7 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 10-09-2023 01:05:20
+# Last modified: 18-10-2026 14:50:33
 
 
 import os
@@ -20,9 +20,11 @@ from typing import Literal, Union
 
 os.environ['OPENBLAS_NUM_THREADS'] = '1'
 
+import numpy as np
 from mpi4py import MPI
 
 from .. import constants as cs
+from ..core.timers import Timers
 from .utils import MPIComm, GatherResponseType
 
 
@@ -33,6 +35,7 @@ class MC():  # MPI conf
         self.mpi_rank: int = mpi_rank
         self.mpi_size: int = mpi_size
         self.logger: logging.Logger = logger
+        self.timers: Timers = Timers()
 
 
 class MPI_TAGS(int, Enum):
@@ -49,6 +52,28 @@ class MPI_TAGS(int, Enum):
     SERV_DATA_1 = 10
     SERV_DATA_2 = 11
     SERV_DATA_3 = 12
+    REQUEST = 13
+    GRANT = 14
+    CREDIT = 15
+    RESULT = 16
+
+
+def send_state(mpi_comm: MPIComm, state: int, dest: int = 0) -> None:
+    # typed message, so root can receive it into persistent buffer
+    mpi_comm.Send(np.array([state], dtype=np.int64), dest=dest, tag=MPI_TAGS.STATE)
+
+
+class Progress():
+    def __init__(self, mpi_comm: MPIComm, interval: float = 1.0) -> None:
+        self.mpi_comm: MPIComm = mpi_comm
+        self.interval: float = interval
+        self.last: float = 0.0
+
+    def __call__(self, counter: int) -> None:
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            send_state(self.mpi_comm, counter)
+            self.last = now
 
 
 def blockPrint() -> None:
@@ -6,6 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 16-09-2023 00:42:10
+# Last modified: 18-10-2026 15:05:45
 
 # from . import simp
+from . import runner
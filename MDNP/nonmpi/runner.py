@@ -0,0 +1,151 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:16:06
+
+import os
+import json
+import argparse
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Literal, Tuple
+
+os.environ["OPENBLAS_NUM_THREADS"] = "1"
+
+import numpy as np
+from numpy import typing as npt
+
+from .. import constants as cs
+from ..core import frame, distribution, kernels
+from ..core.assembly import Assembler, pack
+from ..utils import bearbeit, storage_rsolve, distribute
+
+
+MODES = ("matr", "simp", "simp_s")
+COLUMNS = {"matr": kernels.MATR_COLUMNS, "simp": (0, 6), "simp_s": (0, 2)}
+
+Row = Tuple[int, int, int, npt.NDArray[np.float64], int, int]
+
+
+def setup_logger(cwd: Path, name: str, level: int = logging.INFO) -> logging.Logger:
+    folder = cwd / cs.folders.log / cs.folders.post_process_log
+    folder.mkdir(exist_ok=True, parents=True)
+
+    handler = logging.FileHandler(folder / f"{name}.log")
+    handler.setFormatter(cs.obj.formatter)
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.addHandler(handler)
+
+    return logger
+
+
+def work(cwd: Path, ino: int, storages: Dict[str, Dict[str, int]], mode: str, params: Dict[str, Any], ntb_fp: Path, check: bool = False) -> List[Row]:
+    # runs in pool process: reads its own chunk, so frames never cross processes
+    rows: List[Row] = []
+    norm = frame.Normaliser()
+    channels = 1
+    if mode == "matr":
+        backend: str = params[cs.fields.backend]
+        engine = distribution.ClusterEngine(distribution.make_box(params[cs.fields.dimensions], backend), params[cs.fields.N_atoms],
+                                            cutoffs=params[cs.fields.cutoffs], min_neighbors=params[cs.fields.min_neighbors], backend=backend)
+        channels = len(params[cs.fields.cutoffs])
+    logger = logging.getLogger(f"local.{ino}")
+    adout = kernels.open_storage(ntb_fp, logger, mode == "simp", channels)
+    begin, end = COLUMNS[mode]
+    batch = params[cs.fields.batch] if mode == "matr" else 1
+    items = kernels.read_task(cwd, ino, storages, begin, end, np.float32 if mode == "matr" else None, copy=batch > 1)
+    if mode == "matr" and check:
+        items = kernels.validated(items, params, logger)
+    worker_step = 0
+    for (group,) in kernels.batches(items, batch):
+        if mode == "matr":
+            batch_results = kernels.matr_batch(engine, [raw for _, _, raw in group])
+        else:
+            batch_results = [kernels.simp_rows(norm, raw, mode == "simp") for _, _, raw in group]
+        for (stepnd, real_timestep, _), results in zip(group, batch_results):
+            kernels.write_row(adout, worker_step, stepnd, real_timestep, results)
+            for c, (sizes, counts, temps, total) in enumerate(results):
+                payload, n, k = pack(sizes, counts, temps, total)
+                rows.append((stepnd, real_timestep, c, payload, n, k))
+            worker_step += 1
+    adout.close()
+    return rows
+
+
+def main() -> Literal[0]:
+    cwd = Path.cwd()
+
+    parser = argparse.ArgumentParser(description='Generate cluster distribution matrix from ADIOS2 LAMMPS data on local process pool.')
+    parser.add_argument('--debug', action='store_true', help='Debug logging')
+    parser.add_argument('--mode', action='store', type=str, choices=MODES, default="simp", help='Mode to run')
+    parser.add_argument('--processes', action='store', type=int, default=os.cpu_count(), help='Number of pool processes')
+    parser.add_argument('--chunk', action='store', type=int, default=None, help='Steps per task, four tasks per process if not set')
+    parser.add_argument('--cutoffs', action='store', type=float, nargs='+', default=[distribution.R_MAX], help='Cluster bond lengths (mode matr)')
+    parser.add_argument('--min-neighbors', action='store', type=int, default=0, help='Atoms with fewer neighbours are not bonded into clusters')
+    parser.add_argument('--batch', action='store', type=int, default=1, help='Frames clustered together in one union-find pass, cells backend (mode matr)')
+    parser.add_argument('--backend', action='store', type=str, choices=distribution.BACKENDS, default=distribution.DEFAULT_BACKEND, help='Clustering backend, cells one needs only numpy; freud if installed by default')
+    args = parser.parse_args()
+    if args.mode == "matr":
+        # fails here rather than inside every pool process
+        distribution.check_backend(args.backend)
+
+    logger = setup_logger(cwd, 'local', logging.DEBUG if args.debug else logging.INFO)
+    logger.info(f"Envolved args: {args}")
+
+    data_file = cwd / cs.files.data
+    with open(data_file, 'r') as fp:
+        son: Dict[str, Any] = json.load(fp)
+    storages = storage_rsolve(cwd, son[cs.fields.storages])
+    N_atoms, bdims = bearbeit(cwd / list(storages.keys())[0])
+    son[cs.fields.N_atoms] = N_atoms
+    son[cs.fields.volume] = np.prod(bdims)
+    son[cs.fields.dimensions] = list(bdims)
+    son[cs.fields.storages] = storages
+    son[cs.fields.cutoffs] = args.cutoffs
+    son[cs.fields.min_neighbors] = args.min_neighbors
+    son[cs.fields.backend] = args.backend
+    son[cs.fields.batch] = max(1, args.batch)
+    with open(data_file, 'w') as fp:
+        json.dump(son, fp)
+
+    folder: Path = cwd / son[cs.fields.data_processing_folder]
+    folder.mkdir(exist_ok=True)
+
+    # same partitioning as static and chunked MPI runs
+    processes = max(1, args.processes)
+    total = sum(storages.values())
+    chunk = args.chunk if args.chunk is not None else int(np.ceil(total / (4 * processes)))
+    wd = distribute(storages, max(1, int(np.ceil(total / max(1, chunk)))))
+    tasks: List[Tuple[int, Dict[str, Dict[str, int]]]] = [(wd[str(i)][cs.fields.number], wd[str(i)][cs.fields.storages]) for i in range(len(wd))]  # type: ignore
+    where: Dict[int, Path] = {ino: folder / f"ntb.{ino}.bp" for ino, _ in tasks}
+    logger.info(f"Distributed {total} steps over {len(tasks)} tasks for {processes} processes")
+
+    # only simp computes temperatures, simp_s gets no temps.npy
+    assembler = Assembler(temps=args.mode == "simp", channels=len(args.cutoffs) if args.mode == "matr" else 1)
+    with ProcessPoolExecutor(processes) as pool:
+        # first task checks cells backend against freud
+        futures = [pool.submit(work, cwd, ino, task, args.mode, son, where[ino], i == 0) for i, (ino, task) in enumerate(tasks)]
+        # collected in order of tasks, so rows of every storage are added in order they were written
+        for i, ((ino, _), future) in enumerate(zip(tasks, futures)):
+            for step, timestep, channel, payload, n, k in future.result():
+                assembler.add(ino, step, timestep, payload, n, k, channel)
+            logger.info(f"Task {i + 1}/{len(tasks)} done")
+
+    logger.info("Writing matrix")
+    assembler.finish(folder)
+    assembler.catalog(where).save(folder / cs.files.catalog)
+    logger.info("Done")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -6,7 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 17-09-2023 11:12:20
+# Last modified: 18-10-2026 15:28:08
 
 import json
 import logging
@@ -16,9 +16,10 @@ from typing import List, Dict, Any, Literal
 
 import adios2  # type: ignore
 import numpy as np
-from numpy import typing as npt
 
 from .. import constants as cs
+from ..core import stats, frame
+from ..core.reader import Reader
 from ..mpi.sense.root.new import gen_matrix
 
 
@@ -34,69 +35,31 @@ def proceed(cwd: Path, storages: List[str], process_folder: str, Natoms: int, lo
     # kB = 1.380649e-23
     worker_counter = 0
     max_cluster_size: int = 0
-    sizes: npt.NDArray[np.uint64] = np.arange(1, Natoms + 1, dtype=np.uint64)
     ntb_fp: Path = cwd / process_folder / "ntb.bp"
+    norm = frame.Normaliser()
     logger.info(f"Trying to create adios storage: {ntb_fp.as_posix()}")
     with adios2.open(ntb_fp.as_posix(), 'w') as adout:  # type: ignore
         logger.info("Stating main loop")
         for storage in storages:
             storage_fp = (cwd / storage).as_posix()
             logger.debug(f"Trying to open {storage_fp}")
-            with adios2.open(storage_fp, 'r') as reader:  # type: ignore
+            with Reader(storage_fp) as reader:
                 i = 0
                 logger.debug("Started this storage")
-                for fstep in reader:
-                    arr = fstep.read(cs.lcf.lammps_dist)
-                    arr = arr[arr[:, 0].argsort()]
-                    real_timestep = fstep.read(cs.lcf.real_timestep)
-                    ids = arr[:, 0].astype(dtype=np.int64)
-                    cl_ids = arr[:, 1].astype(dtype=np.int64)
-                    masses = arr[:, 2].astype(dtype=np.int64)
-                    vxs = arr[:, 3].astype(dtype=np.float32)
-                    vys = arr[:, 4].astype(dtype=np.float32)
-                    vzs = arr[:, 5].astype(dtype=np.float32)
-                    # temp = arr[:, 6].astype(dtype=np.float32)
-
-                    together = np.vstack([cl_ids, ids]).T
-                    together = together[together[:, 0].argsort()]
-                    ids_by_cl_id = np.split(together[:, 1], np.unique(together[:, 0], return_index=True)[1][1:])
-
-                    cl_unique_ids = np.arange(1, len(ids_by_cl_id)+1, dtype=np.int64)
-
-                    cl_sizes = np.array([len(ids) for ids in ids_by_cl_id])
-                    cl_unique_sizes, sizes_cnt = np.unique(cl_sizes, return_counts=True)
-
-                    dist = np.zeros(Natoms + 1, dtype=np.uint32)
-                    dist[cl_unique_sizes] = sizes_cnt
-                    dist = dist[1:]
-
-                    cl_unique_sizes.sort()
-
-                    ids_n_sizes = np.vstack([cl_sizes, cl_unique_ids]).T
-                    ids_n_sizes = ids_n_sizes[ids_n_sizes[:, 0].argsort()]
-                    cl_ids_by_size = np.split(ids_n_sizes[:, 1], np.unique(ids_n_sizes[:, 0], return_index=True)[1][1:])
-
-                    ids_by_cl_id = np.array(ids_by_cl_id, dtype=object)
-                    ids_by_size = [np.stack(np.take(ids_by_cl_id, (cl_ids_w_size-1))).flatten('A') for cl_ids_w_size in cl_ids_by_size]  # type: ignore
-
-                    vs_square = vxs**2 + vys**2 + vzs**2
-                    kes = masses * vs_square / 2
-                    sum_ke_by_size = np.array([np.sum(np.take(kes, ids_s-1)) for ids_s in ids_by_size])
-                    atom_counts_by_size = cl_unique_sizes*sizes_cnt
-                    ndofs_by_size = atom_counts_by_size*(ndim-1)
-                    temp_by_size = (sum_ke_by_size / ndofs_by_size) * 2
+                for _ in reader.steps():
+                    arr = norm(reader.read_columns(cs.lcf.lammps_dist, 0, 6))
+                    real_timestep = np.array(reader.read_one(cs.lcf.real_timestep))
+                    cl_unique_sizes, sizes_cnt, temp_by_size, total_temp = stats.summary(arr, True, ndim, stats.ndofs_nonmpi)
                     # stepnd = worker_counter + ino
-                    total_temp = (np.sum(kes) / (Natoms * (ndim - 1))) * 2
 
                     adout.write(cs.lcf.real_timestep, real_timestep)  # type: ignore
                     adout.write(cs.lcf.worker_step, np.array(worker_counter))  # type: ignore
                     adout.write(cs.lcf.tot_temp, np.array(total_temp))  # type: ignore
                     adw(adout, cs.lcf.sizes, cl_unique_sizes)
                     adw(adout, cs.lcf.size_counts, sizes_cnt)
-                    adw(adout, cs.lcf.cl_temps, temp_by_size)
-                    adw(adout, cs.lcf.mat_dist, dist, True)
+                    adw(adout, cs.lcf.cl_temps, temp_by_size, True)
 
-                    max_cluster_size = int(np.argmax(sizes[dist != 0]) + 1)
+                    max_cluster_size = max(max_cluster_size, int(cl_unique_sizes[-1]))
 
                     worker_counter += 1
 
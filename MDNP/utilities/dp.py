@@ -6,23 +6,25 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 16-12-2023 21:25:44
+# Last modified: 18-10-2026 15:14:41
 
 import csv
 import json
 import argparse
 from pathlib import Path
-from typing import Dict, Tuple, Union
+from contextlib import ExitStack
+from typing import Dict, Iterable, List, Tuple, Union
 
 import numpy as np
 import pandas as pd  # type: ignore
 from numpy import typing as npt
 
-from ..core import calc, props
+from ..core import calc, props, matrix, temperature
+from ..core.temperature import TemperatureSeries
 from .. import constants as cs
 
 
-BUF_SIZE = 65536  # 64kb
+BLOCK = 1 << 22  # matrix elements processed at once
 
 
 def find_file(cwd: Path, file: Union[str, None], subf: str, defname: str) -> Path:
@@ -43,101 +45,125 @@ def find_file(cwd: Path, file: Union[str, None], subf: str, defname: str) -> Pat
     raise FileNotFoundError(f"File {f.as_posix()} cannot be found")
 
 
-def proceed(infile: Path, outfile: Path, conf: Dict, temp_mat: Tuple[npt.NDArray[np.uint64], npt.NDArray[np.float32]], cut: int, km: int):
-    temptime, temperatures = temp_mat
+def proceed(blocks: Iterable[npt.NDArray], outfile: Path, conf: Dict, series: TemperatureSeries, cut: int, km: int):
+    return proceed_many(blocks, [(outfile, km)], conf, series, cut)
+
+
+def proceed_many(blocks: Iterable[npt.NDArray], outs: List[Tuple[Path, int]], conf: Dict, series: TemperatureSeries, cut: int):
+    # one pass over blocks of matrix rows, one output file per kmin
     dis = conf[cs.fields.every]
     N_atoms = conf[cs.fields.N_atoms]
     time_step = conf[cs.fields.time_step]
     volume = conf[cs.fields.volume]
     sizes: npt.NDArray[np.uint32] = np.arange(1, cut + 1, 1, dtype=np.uint32)
-    with pd.read_csv(infile, header=None, chunksize=BUF_SIZE) as reader, open(outfile, "w") as csv_file:
-        writer = csv.writer(csv_file, delimiter=',')
-        writer.writerow(calc.get_spec())
-        chunk: pd.DataFrame
-        for chunk in reader:
-            for index, row in chunk.iterrows():
-                step = int(row[0])
-                try:
-                    dist = row[1:].to_numpy(dtype=np.uint32)
-                    # print(f"Searching for {int(step * dis)}")
-                    temp: float = temperatures[temptime == int(step)][0]  # type: ignore
-                    tow = calc.get_row(step, sizes, dist, temp, N_atoms, volume, time_step, dis, km)
-                    writer.writerow(tow)
-                except Exception:
-                    print(f"Step: {step}, exception.")
-                    raise
+    with ExitStack() as stack:
+        writers = [csv.writer(stack.enter_context(open(outfile, "w")), delimiter=',') for outfile, _ in outs]
+        for writer in writers:
+            writer.writerow(calc.get_spec())
+        caches = [calc.NvsCache(sizes, km) for _, km in outs]
+        for block in blocks:
+            steps = block[:, 0].astype(np.int64)
+            # print(f"Searching for {int(step * dis)}")
+            try:
+                temps = series.exact(steps)
+            except KeyError:
+                print(f"Step: {steps[0]}..{steps[-1]}, exception.")
+                raise
+            for writer, cache, (_, km) in zip(writers, caches, outs):
+                writer.writerows(calc.get_rows(steps, sizes, block[:, 1:], temps, N_atoms, volume, time_step, dis, km, cache))
 
     return 0
 
 
-def ncut(infile: Path) -> int:
-    with infile.open("r") as f:
-        reader = csv.reader(f, delimiter=",")
-        for line in reader:
-            return len(line) - 1
-    return 0
+def ncut(mat: npt.NDArray) -> int:
+    return mat.shape[1] - 1
+
+
+class MatrixView():
+    def __init__(self, data_file: Path) -> None:
+        self.path = data_file
+        self.index = matrix.step_index(data_file)
+        self.cut: int = self.index.cols
+        self.binary: bool = data_file.suffix == ".npy"
+        self._mat: Union[npt.NDArray, None] = np.load(data_file, mmap_mode='r') if self.binary else None
+
+    def blocks(self) -> Iterable[npt.NDArray]:
+        # text matrix is streamed, never parsed whole
+        return matrix.chunks(self.path, max(1, BLOCK // (self.cut + 1)))
+
+    def dist(self, step: int) -> npt.NDArray[np.uint32]:
+        pos = self.index.find(step)
+        if self._mat is not None:
+            return self._mat[pos, 1:].astype(np.uint32)
+        return matrix.read_line(self.path, pos, np.uint32)[1:]
 
 
-def km(infile: Path, conf: Dict, cut: int, eps: float) -> int:
+def nearest(cum: npt.NDArray, value: float) -> int:
+    # first index of value of non-decreasing cum closest to given one
+    j = int(np.searchsorted(cum, value))
+    if j == len(cum) or (j > 0 and value - cum[j - 1] <= cum[j] - value):
+        return int(np.searchsorted(cum, cum[j - 1]))
+    return j
+
+
+def kmin_of(Sdist: npt.NDArray, eps: float, Natoms: int) -> int:
+    # least i + 1 such that clusters smaller than i hold eps of atoms, 0 if none
+    if eps * Natoms <= 0:
+        return 1
+    j = int(np.searchsorted(np.cumsum(Sdist), eps * Natoms))
+    return j + 2 if j < len(Sdist) - 1 else 0
+
+
+def km(view: MatrixView, conf: Dict, cut: int, eps: float) -> int:
     fst = round(conf[cs.fields.step_before] / conf[cs.fields.every])
     N_atoms = conf[cs.fields.N_atoms]
     sizes = np.arange(1, cut + 1, 1)
-    with pd.read_csv(infile, header=None, chunksize=BUF_SIZE) as reader:
-        chunk: pd.DataFrame
-        for chunk in reader:
-            index = chunk[0].to_numpy(dtype=np.uint32)
-            if len(index[index == fst]) == 1:
-                ind = np.where(index == fst)
-                dist = chunk.iloc[ind].to_numpy(dtype=np.uint32)[0][1:]  # type: ignore
-
-                ld = np.array([np.sum(sizes[:i]*dist[:i]) / N_atoms for i in range(1, len(dist))], dtype=np.float32)
-                km = np.argmin(np.abs(ld - eps))
-                return int(km)
+    try:
+        dist: Union[npt.NDArray[np.uint32], None] = view.dist(fst)
+    except KeyError:
+        dist = None
+    if dist is not None:
+
+        ld = np.cumsum(sizes * dist)[:-1] / N_atoms
+        return nearest(ld, eps)
     raise KeyError(f"Step before {conf[cs.fields.step_before]}/{conf[cs.fields.every]}={fst} not found in matrix")
 
 
-def get_spec_step(infile: Path, needed_step: int) -> npt.NDArray[np.uint64]:
-    with pd.read_csv(infile, header=None, chunksize=BUF_SIZE) as reader:
-        chunk: pd.DataFrame
-        for chunk in reader:
-            for index, row in chunk.iterrows():
-                step = int(row[0])
-                if step == needed_step:
-                    dist = row[1:].to_numpy(dtype=np.uint32)
-                    return dist
-    raise Exception("Specified step not found")
+def get_spec_step(view: MatrixView, needed_step: int) -> npt.NDArray[np.uint64]:
+    try:
+        return view.dist(needed_step)
+    except KeyError:
+        raise Exception("Specified step not found")
 
 
-def get_S1_dist(cwd: Path, son: Dict, data_file: Path, dis: int) -> npt.NDArray[np.uint64]:
-    temperatures_mat = pd.read_csv(cwd / cs.files.temperature, header=None)
-    temptime: npt.NDArray[np.uint64] = temperatures_mat[0].to_numpy(dtype=np.uint64)
-    temperatures: npt.NDArray[np.float32] = temperatures_mat[1].to_numpy(dtype=np.float32)
+def get_S1_dist(cwd: Path, son: Dict, view: MatrixView, dis: int) -> npt.NDArray[np.uint64]:
+    series = temperature.load(cwd / cs.files.temperature)
 
     N_atoms: int = son[cs.fields.N_atoms]
     nvz: float = N_atoms/son[cs.fields.volume]
     Stemp: float = props.nvs_reverse(nvz)
-    Sstep_var: float = temptime[np.argmin(np.abs(temperatures - Stemp))]
+    Sstep_var: float = series.time_of(Stemp)
     Sstep: int = int(Sstep_var/dis) + 1
 
-    return get_spec_step(data_file, Sstep)
+    return get_spec_step(view, Sstep)
 
 
-def get_named_moment(cwd: Path, son: Dict, data_file: Path, val: str, dis: int) -> npt.NDArray[np.uint64]:
+def get_named_moment(cwd: Path, son: Dict, view: MatrixView, val: str, dis: int) -> npt.NDArray[np.uint64]:
     if val == "S1":
-        return get_S1_dist(cwd, son, data_file, dis)
+        return get_S1_dist(cwd, son, view, dis)
     else:
         raise Exception(f"Unknown named moment: {val}")
 
 
-def dist_getter(cwd: Path, args: argparse.Namespace, son: Dict, data_file: Path, dt: float, dis: int, sizes: npt.NDArray[np.uint64], cut: int):
+def dist_getter(cwd: Path, args: argparse.Namespace, son: Dict, view: MatrixView, dt: float, dis: int, sizes: npt.NDArray[np.uint64], cut: int):
     if args.method == 'name':
-        dist: npt.NDArray[np.uint64] = get_named_moment(cwd, son, data_file, str(args.value), dis)
+        dist: npt.NDArray[np.uint64] = get_named_moment(cwd, son, view, str(args.value), dis)
     elif args.method == 'abs':
-        dist = get_spec_step(data_file, round(args.value / dt / dis))
+        dist = get_spec_step(view, round(args.value / dt / dis))
     elif args.method == 'step':
-        dist = get_spec_step(data_file, round(args.value / dis))
+        dist = get_spec_step(view, round(args.value / dis))
     elif args.method == 'num':
-        dist = get_spec_step(data_file, round(args.value))
+        dist = get_spec_step(view, round(args.value))
     else:
         raise Exception("Unknown method")
 
@@ -161,42 +187,44 @@ def dist_getter(cwd: Path, args: argparse.Namespace, son: Dict, data_file: Path,
     return 0
 
 
-def run(data_file: Path, outfile: Path, temp_file: Path, son: Dict, eps: float, kmin: Union[int, None] = None):
+def run(data_file: Path, outfile: Path, temp_file: Path, son: Dict, eps: Union[List[float], float], kmin: Union[List[int], int, None] = None):
     # dt: float = son[cs.fields.time_step]
     dis: int = son[cs.fields.every]
     Natoms: int = son[cs.fields.N_atoms]
     nvz: float = Natoms/son[cs.fields.volume]
 
-    cut: int = ncut(data_file)
+    view = MatrixView(data_file)
+    cut: int = view.cut
     sizes: npt.NDArray[np.uint64] = np.arange(1, cut + 1, 1, dtype=np.int64)
 
-    temperatures_mat = pd.read_csv(temp_file, header=None)
-    temptime: npt.NDArray[np.uint64] = temperatures_mat[0].to_numpy(dtype=np.uint64)
-    temperatures: npt.NDArray[np.float32] = temperatures_mat[1].to_numpy(dtype=np.float32)
+    series = temperature.load(Path(temp_file))
     # print(f"Temptime shape: {temptime.shape}")
     # print(f"Temperature shape: {temperatures.shape}")
 
     # N_atoms: int = son[cs.fields.N_atoms]
+    epss = eps if isinstance(eps, list) else [eps]
+    kmins: List[int]
     if kmin is None:
         Stemp = props.nvs_reverse(nvz)
-        Sstep_var: float = temptime[np.argmin(np.abs(temperatures - Stemp))]
+        Sstep_var: float = series.time_of(Stemp)
         Sstep: int = int(Sstep_var) + 1
 
-        Sdist = get_spec_step(data_file, Sstep)
+        Sdist = get_spec_step(view, Sstep)
         Sdist = Sdist * sizes
 
-        kmin = 0
-        for i in range(len(Sdist)):
-            dat: int = int(np.sum(Sdist[:i]))
-            if dat >= eps * Natoms:
-                kmin = i + 1
-                break
+        kmins = [kmin_of(Sdist, e, Natoms) for e in epss]
+        labels = [f"eps{e}" for e in epss]
     else:
-        pass
+        kmins = kmin if isinstance(kmin, list) else [kmin]
+        labels = [f"kmin{k}" for k in kmins]
 
-    print(f"kmin is {kmin}")
+    outs: List[Tuple[Path, int]] = []
+    for label, k in zip(labels, kmins):
+        print(f"kmin is {k}" if len(kmins) == 1 else f"kmin for {label} is {k}")
+        # several values are written next to each other, named after them
+        outs.append((outfile if len(kmins) == 1 else outfile.with_name(f"{outfile.stem}.{label}{outfile.suffix}"), k))
 
-    return proceed(data_file, outfile, son, (temptime, temperatures), cut, kmin)
+    return proceed_many(view.blocks(), outs, son, series, cut)
 
 
 def main(a: None = None):
@@ -207,17 +235,22 @@ def main(a: None = None):
     sub_parsers = parser.add_subparsers(help='Select actrion', dest="command")
 
     parser_run = sub_parsers.add_parser('run', help='Proceed distribution matrix')
-    parser_run.add_argument('--eps', action='store', type=float, default=0.95, required=False, help='Epsilon')
-    parser_run.add_argument('--kmin', action='store', type=int, default=None, required=False, help='kmin')
+    parser_run.add_argument('--eps', action='store', type=float, nargs='+', default=[0.95], required=False, help='Epsilon, several values give one output per value')
+    parser_run.add_argument('--kmin', action='store', type=int, nargs='+', default=None, required=False, help='kmin, several values give one output per value')
     parser_run.add_argument('--temp_file', action='store', type=str, required=False, help='File with temperatures')
     parser_run.add_argument('--data_file', action='store', type=str, required=False, help='File with data')
     # parser_run.add_argument('--out_file', action='store', type=str, required=False, help='File write to')
 
+    parser_export = sub_parsers.add_parser('export', help='Export binary distribution matrix to csv')
+    parser_export.add_argument('--data_file', action='store', type=str, required=False, help='File with data')
+    parser_export.add_argument('--out_file', action='store', type=str, required=False, help='File write to')
+
     parser_dist = sub_parsers.add_parser('dist', help='Get specific distribution')
     parser_dist.add_argument('--type', action='store', type=str, default='norm', required=False, help='File to proceed')
     parser_dist.add_argument('--h', action='store', type=int, default=1, required=False, help='Window width')
     parser_dist.add_argument('--dh', action='store', type=int, default=0, required=False, help='Window width increment')
     parser_dist.add_argument('--suffix', action='store', type=str, default='', required=False, help='Suffix to filename')
+    parser_dist.add_argument('--data_file', action='store', type=str, required=False, help='File with data')
 
     dist_sub_parsers = parser_dist.add_subparsers(help='Designation method', dest="method")
     parser_name = dist_sub_parsers.add_parser('name', help='Get by name')
@@ -247,20 +280,27 @@ def main(a: None = None):
     # dt: float = son[cs.fields.time_step]
     # dis: int = son[cs.fields.every]
     # Natoms: int = son[cs.fields.N_atoms]
-    km_eps = args.eps
-    kmin = args.kmin
     subf: str = son[cs.fields.data_processing_folder]
-    data_file: Path = cwd / subf / cs.files.cluster_distribution_matrix if args.data_file is None else Path(args.data_file)
-    outfile: Path = cwd / subf / cs.files.comp_data if args.data_file is None else Path(*(list(Path(args.data_file).parts[:-1]) + [cs.files.comp_data]))
-    temp_file = cwd / cs.files.temperature if args.temp_file is None else args.temp_file
+    if args.command == 'export':
+        data_file_bin: Path = cwd / subf / cs.files.matrix if args.data_file is None else Path(args.data_file)
+        out_file = matrix.to_csv(data_file_bin, None if args.out_file is None else Path(args.out_file))
+        print(f"Written {out_file.as_posix()}")
+        return 0
+
+    data_file: Path = cwd / subf / cs.files.matrix if args.data_file is None else Path(args.data_file)
+    if args.data_file is None and not data_file.exists():
+        data_file = cwd / subf / cs.files.cluster_distribution_matrix
 
     # data_file: Path = find_file(cwd, args.file, subf, cs.files.cluster_distribution_matrix)
 
     if args.command == 'run':
-        return run(data_file, outfile, temp_file, son,  km_eps, kmin)
+        outfile: Path = cwd / subf / cs.files.comp_data if args.data_file is None else Path(*(list(Path(args.data_file).parts[:-1]) + [cs.files.comp_data]))
+        temp_file = cwd / cs.files.temperature if args.temp_file is None else args.temp_file
+        return run(data_file, outfile, temp_file, son, args.eps, args.kmin)
     elif args.command == 'dist':
-        raise NotImplementedError
-        # return dist_getter(cwd, args, son, data_file, dt, dis, sizes, cut)
+        view = MatrixView(data_file)
+        sizes: npt.NDArray[np.uint64] = np.arange(1, view.cut + 1, 1, dtype=np.uint64)
+        return dist_getter(cwd, args, son, view, son[cs.fields.time_step], son[cs.fields.every], sizes, view.cut)
     else:
         raise Exception(f"Unknown command: {args.command}")
 
@@ -6,7 +6,7 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 18-09-2023 02:15:46
+# Last modified: 18-10-2026 14:53:03
 
 # TODO:
 # Change parser description
@@ -25,6 +25,8 @@ import numpy as np
 from numpy import typing as npt
 
 from .. import constants as cs
+from ..core import distribution, catalog
+from ..core.catalog import Catalog
 
 
 def rms(arr: npt.NDArray[np.uint32]) -> npt.NDArray[np.float32]:
@@ -51,8 +53,11 @@ def process(file: Path, hms: int, lc: int, cut: int = 100):
             writer = csv.writer(csv_file, delimiter=',')
             counter = lc
             for step in adout:
-                dist: npt.NDArray[np.uint32] = step.read(cs.lcf.mat_dist)
-                dist = dist[:cut]
+                dist: npt.NDArray[np.uint32]
+                if cs.lcf.mat_dist in step.available_variables():
+                    dist = step.read(cs.lcf.mat_dist)[:cut]
+                else:
+                    dist = distribution.to_dense(step.read(cs.lcf.sizes), step.read(cs.lcf.size_counts), cut)
 
                 buffer[counter, :] = dist
 
@@ -69,11 +74,34 @@ def process(file: Path, hms: int, lc: int, cut: int = 100):
     return counter
 
 
+def process_catalog(cat: Catalog, write_file: Path, hms: int, cut: int = 100):
+    # steps in global order, wherever they are stored
+    buffer: npt.NDArray[np.uint32] = np.zeros((hms, cut), dtype=np.uint32)  # type: ignore
+    with cat, open(write_file, "w") as csv_file:
+        writer = csv.writer(csv_file, delimiter=',')
+        counter = 0
+        for row in cat.rows:
+            reader = cat.reader(row)
+            if reader.has(cs.lcf.mat_dist):
+                buffer[counter, :] = reader.read_array(cs.lcf.mat_dist)[:cut]
+            else:
+                buffer[counter, :] = distribution.to_dense(reader.read_array(cs.lcf.sizes), reader.read_array(cs.lcf.size_counts), cut)
+
+            counter += 1
+
+            if counter == hms:
+                writer.writerow(rms(buffer))
+                counter = 0
+                csv_file.flush()
+                print("written")
+    return counter
+
+
 def main(a: None = None):
     parser = argparse.ArgumentParser(prog="fluct.py", description='CHANGEME.')
     parser.add_argument('--debug', action='store_true', help='Debug, prints only parsed arguments')
     parser.add_argument('--dT', type=float, default=0.08, help='???')
-    parser.add_argument('--re', type=str, help='File regex')
+    parser.add_argument('--re', type=str, default=None, help='File regex, steps are taken from catalog if not set')
 
     args = parser.parse_args()
     if args.debug:
@@ -85,6 +113,12 @@ def main(a: None = None):
         fp = json.load(f)
 
     folder: Path = cwd / fp[cs.fields.data_processing_folder]
+    hms = round(args.dT / fp[cs.fields.xi] / fp[cs.fields.time_step] / fp[cs.fields.every])
+
+    if args.re is None:
+        print(f"Hms is {hms} steps")
+        process_catalog(catalog.load(folder / cs.files.catalog), folder / "fluct.csv", hms)
+        return 0
 
     storages: List[str] = []
     stf: Path
@@ -102,7 +136,6 @@ def main(a: None = None):
     # except KeyError:
     #     raise
 
-    hms = round(args.dT / fp[cs.fields.xi] / fp[cs.fields.time_step] / fp[cs.fields.every])
     print(f"Hms is {hms} steps")
 
     lc = 0
@@ -6,10 +6,10 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 
-# Last modified: 16-09-2023 19:00:16
+# Last modified: 18-10-2026 15:05:45
 
 from pathlib import Path
-from typing import Union, Iterable, Tuple
+from typing import Union, Iterable, Tuple, Dict
 
 import adios2
 import numpy as np
@@ -40,3 +40,47 @@ def bearbeit(storage: Path) -> Tuple[int, npt.NDArray[np.float32]]:
 
     bdims = np.array([Lx, Ly, Lz])
     return (N, bdims)
+
+
+def storage_rsolve(cwd: Path, _storages: Iterable[str]) -> Dict[str, int]:
+    storages: Dict[str, int] = {}
+    for storage in _storages:
+        file = cwd / storage
+        if not file.exists():
+            raise FileNotFoundError(f"Storage {file.as_posix()} cannot be found")
+        with adios2.open(file.as_posix(), 'r') as reader_c:  # type: ignore
+            storages[storage] = reader_c.steps()
+    return storages
+
+
+def distribute(storages: Dict[str, int], mm: int) -> Dict[str, Dict[str, Union[int, Dict[str, int]]]]:
+    ll = sum(list(storages.values()))
+    dp = np.linspace(0, ll - 1, mm + 1, dtype=int)
+    bp = dp
+    dp = dp[1:] - dp[:-1]
+    dp = np.vstack([bp[:-1].astype(dtype=int), np.cumsum(dp).astype(dtype=int)])
+    wd: Dict[str, Dict[str, Union[int, Dict[str, int]]]] = {}
+    st = {}
+    for storage, value in storages.items():
+        st[storage] = value
+    ls = 0
+    for i, (begin_, end_) in enumerate(dp.T):
+        begin = int(begin_)
+        end = int(end_)
+        beg = 0 + ls
+        en = end - begin
+        wd[str(i)] = {cs.fields.number: begin, cs.fields.storages: {}}
+        for storage in list(st):
+            value = st[storage]
+            if en >= value:
+                wd[str(i)][cs.fields.storages][storage] = {cs.fields.begin: beg, cs.fields.end: value}  # type: ignore
+                en -= value
+                ls = 0
+                beg = 0
+                del st[storage]
+            elif en < value:
+                wd[str(i)][cs.fields.storages][storage] = {cs.fields.begin: beg, cs.fields.end: en}  # type: ignore
+                st[storage] -= en
+                ls += en
+                break
+    return wd
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3.8
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2023 Perevoshchikov Egor
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Last modified: 18-10-2026 15:29:04
+
+# numpy-only clustering backend checked against brute force, so it stays verified where freud is missing
+
+import numpy as np
+from numpy import typing as npt
+
+from MDNP.core import cells, distribution
+
+
+CUTOFFS = [1.5, 1.2, 0.9]
+
+
+def brute_bonds(points: npt.NDArray, L: npt.NDArray, r_max: float) -> npt.NDArray[np.bool_]:
+    vec = points[None, :, :] - points[:, None, :]
+    vec -= L * np.round(vec / L)
+    close = np.sqrt(np.einsum('ijk,ijk->ij', vec, vec)) < r_max
+    np.fill_diagonal(close, False)
+    return close
+
+
+def brute_dist(points: npt.NDArray, L: npt.NDArray, r_max: float, min_neighbors: int = 0) -> npt.NDArray[np.uint32]:
+    bonds = brute_bonds(points, L, r_max)
+    bonded = bonds.sum(axis=1) >= min_neighbors
+    bonds &= bonded[:, None] & bonded[None, :]
+    # label of every point is the least index reachable from it
+    labels = np.arange(len(points))
+    while True:
+        new = np.minimum(labels, np.where(bonds, labels[None, :], len(points)).min(axis=1))
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    counts = np.bincount(labels)
+    return distribution.distribution(counts[counts != 0], len(points))
+
+
+def trajectory(rng: np.random.Generator, n: int, frames: int, step: float) -> npt.NDArray[np.float32]:
+    # fractional coordinates, as read from dumps, drifting a bit every frame
+    start = rng.random((n, 3))
+    moves = np.cumsum(rng.normal(0, step, (frames, n, 3)), axis=0)
+    return ((start + moves) % 1).astype(np.float32)
+
+
+def test_pairs():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        L = rng.uniform(2, 9, 3)
+        r_max = float(rng.uniform(0.5, 2.5))
+        points = (rng.random((int(rng.integers(2, 150)), 3)) * L).astype(np.float32)
+        i, j, d = cells.pairs(points, cells.Box(*L), r_max)
+        ref_i, ref_j = np.nonzero(np.triu(brute_bonds(points.astype(np.float64), L, r_max)))
+        assert sorted(zip(i, j)) == sorted(zip(ref_i, ref_j))
+        assert np.all(d < r_max)
+
+
+def test_union_find():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        n = int(rng.integers(1, 200))
+        i, j = rng.integers(0, n, (2, int(rng.integers(0, 2 * n))))
+        bonds = np.zeros((n, n), dtype=np.bool_)
+        bonds[i, j] = bonds[j, i] = True
+        labels = np.arange(n)
+        while not np.array_equal(new := np.minimum(labels, np.where(bonds, labels[None, :], n).min(axis=1)), labels):
+            labels = new
+        assert np.array_equal(cells.union_find(n, i, j), labels)
+
+
+def test_engine():
+    rng = np.random.default_rng(2)
+    L = np.array([9.0, 8.0, 10.0])
+    frames = trajectory(rng, 400, 8, 0.002)
+    for min_neighbors in (0, 2):
+        engine = distribution.ClusterEngine(distribution.make_box(L, "cells"), len(frames[0]), cutoffs=CUTOFFS, min_neighbors=min_neighbors, backend="cells")
+        for frame in frames:
+            got = engine.dists(frame.copy())
+            points = frame.astype(np.float64) * L
+            for c, cutoff in enumerate(CUTOFFS):
+                assert np.array_equal(got[c], brute_dist(points, L, cutoff, min_neighbors))
+        # neighbour list is reused between frames
+        assert engine.frames == len(frames) and engine.builds < len(frames)
+
+
+def test_batch():
+    rng = np.random.default_rng(3)
+    L = np.array([7.0, 7.0, 9.0])
+    frames = trajectory(rng, 300, 9, 0.002)
+    for min_neighbors in (0, 2):
+        def make():
+            return distribution.ClusterEngine(distribution.make_box(L, "cells"), len(frames[0]), cutoffs=CUTOFFS, min_neighbors=min_neighbors, backend="cells")
+        single = make()
+        ref = [single.dists(frame.copy()) for frame in frames]
+        batched = make()
+        got = batched.batch_dists([frame.copy() for frame in frames[:4]]) + batched.batch_dists([frame.copy() for frame in frames[4:]])
+        assert len(got) == len(frames)
+        for r, g in zip(ref, got):
+            assert all(np.array_equal(a, b) for a, b in zip(r, g))
+        assert batched.builds == single.builds
+
+
+def test_batch_cluster_sizes():
+    rng = np.random.default_rng(4)
+    n = 50
+    edges = [tuple(rng.integers(0, n, (2, int(rng.integers(0, 60))))) for _ in range(5)]
+    for (i, j), sizes in zip(edges, cells.batch_cluster_sizes(n, edges)):
+        assert np.array_equal(np.sort(sizes), np.sort(cells.cluster_sizes(n, i, j)))